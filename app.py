@@ -1,63 +1,71 @@
 import os
+import asyncio
 import logging
-from datetime import datetime
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from database import engine, Base, SessionLocal
-from models import *
-from seed_data import create_seed_data
-from routers import auth, patients, providers, appointments, ui, debug
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('fake_carecloud.log'),
-        logging.StreamHandler()
-    ]
-)
+from bootstrap import configure_logging, bootstrap_database
+from archive import ARCHIVE_INTERVAL, archive_periodically
+from faults import FaultInjectionMiddleware, load_from_env as load_faults_from_env
+from recorder import RecorderMiddleware, load_from_env as load_recorder_from_env, recorder
+from tenancy import TenantMiddleware
+from idempotency import IdempotencyMiddleware
+from profiling import ProfilingMiddleware
+from compression import CompressionMiddleware
+from rate_limit import RateLimitHeadersMiddleware
+from database import isolated_databases, tenant_databases
+from routers import auth, patients, providers, appointments, series, stats, export, imports
 
 logger = logging.getLogger("fake_carecloud")
 
-# Configure uvicorn access logging to use our handlers
-uvicorn_logger = logging.getLogger("uvicorn.access")
-uvicorn_logger.handlers = []
-for handler in logging.getLogger().handlers:
-    uvicorn_logger.addHandler(handler)
-
-uvicorn_error_logger = logging.getLogger("uvicorn.error")
-uvicorn_error_logger.handlers = []
-for handler in logging.getLogger().handlers:
-    uvicorn_error_logger.addHandler(handler)
+# The UI (Jinja2, static files) and debug routers are optional so CI can skip them
+UI_ENABLED = os.getenv("FAKE_CARECLOUD_ENABLE_UI", "true").lower() == "true"
+DEBUG_ROUTES_ENABLED = os.getenv("FAKE_CARECLOUD_ENABLE_DEBUG", "true").lower() == "true"
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-logger.info("Database tables created")
-
-# Initialize seed data
-db = SessionLocal()
-create_seed_data(db)
-db.close()
-logger.info("Seed data initialized")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bootstrap runs here rather than at import time
+    configure_logging()
+    bootstrap_database()
+    load_recorder_from_env()
+    logger.info("FastAPI application startup completed")
+    logger.info(f"API Title: {app.title}")
+    logger.info(f"API Version: {app.version}")
+    archiver = asyncio.create_task(archive_periodically()) if ARCHIVE_INTERVAL > 0 else None
+    yield
+    if archiver:
+        archiver.cancel()
+    tenant_databases.close_all()
+    isolated_databases.close_all()
+    recorder.close()
+    logger.info("FastAPI application shutting down")
+    logger.info("Goodbye!")
 
 app = FastAPI(
     title=os.getenv("API_TITLE", "Fake CareCloud API"),
     description="A mock implementation of the CareCloud API for testing purposes",
     version=os.getenv("API_VERSION", "1.0.0"),
+    lifespan=lifespan,
 )
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("FastAPI application startup completed")
-    logger.info(f"API Title: {app.title}")
-    logger.info(f"API Version: {app.version}")
+# Add X-RateLimit-* headers to responses, including those handlers build themselves
+app.add_middleware(RateLimitHeadersMiddleware)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("FastAPI application shutting down")
-    logger.info("Goodbye!")
+# Profile sampled requests when enabled through /debug/profile (a single flag check otherwise)
+app.add_middleware(ProfilingMiddleware)
+
+# Replay responses to retried POSTs carrying an Idempotency-Key (inside tenancy, so keys are per tenant)
+app.add_middleware(IdempotencyMiddleware)
+
+# Select the tenant database (FAKE_CARECLOUD_TENANT_DATABASE_URL) or isolated database (X-Isolation-ID) per request
+app.add_middleware(TenantMiddleware)
+
+# Add fault and latency injection (inactive until configured)
+load_faults_from_env()
+app.add_middleware(FaultInjectionMiddleware)
+
+# Record requests for replay when FAKE_CARECLOUD_RECORD_FILE is set
+app.add_middleware(RecorderMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -68,20 +76,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Compress responses (outermost, so the recorder and idempotency store see plain bodies)
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(auth.router, tags=["Authentication"])  # OAuth endpoint has no /v2 prefix
 app.include_router(patients.router, prefix="/v2", tags=["Patients"])
 app.include_router(providers.router, prefix="/v2", tags=["Providers"])
 app.include_router(appointments.router, prefix="/v2", tags=["Appointments"])
-app.include_router(debug.router, prefix="/debug", tags=["Debug"])
-app.include_router(ui.router, tags=["UI"])
+app.include_router(series.router, prefix="/v2", tags=["Appointment Series"])
+app.include_router(stats.router, prefix="/v2", tags=["Statistics"])
+app.include_router(export.router, prefix="/v2", tags=["Export"])
+app.include_router(imports.router, prefix="/v2", tags=["Import"])
+
+if DEBUG_ROUTES_ENABLED:
+    from routers import debug
+    app.include_router(debug.router, prefix="/debug", tags=["Debug"])
+
+if UI_ENABLED:
+    from fastapi.staticfiles import StaticFiles
+    from routers import ui
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.include_router(ui.router, tags=["UI"])
 
 @app.get("/")
 async def root():
-    return {
+    info = {
         "message": "Fake CareCloud API",
         "version": "1.0.0",
         "docs_url": "/docs",
@@ -92,19 +112,35 @@ async def root():
             "locations": "/v2/locations",
             "appointment_resources": "/v2/appointment_resources",
             "visit_reasons": "/v2/visit_reasons",
-            "appointments": "/v2/appointments"
-        },
-        "ui": {
+            "appointments": "/v2/appointments",
+            "appointment_series": "/v2/appointment_series",
+            "stats": "/v2/stats",
+            "export_patients": "/v2/export/patients",
+            "export_appointments": "/v2/export/appointments",
+            "import_patients": "/v2/import/patients",
+            "import_appointments": "/v2/import/appointments"
+        }
+    }
+    if UI_ENABLED:
+        info["ui"] = {
             "home": "/ui",
             "patients": "/ui/patients",
             "appointments": "/ui/appointments",
             "patient_detail": "/ui/patients/{patient_id}"
-        },
-        "debug": {
+        }
+    if DEBUG_ROUTES_ENABLED:
+        info["debug"] = {
             "all_patients": "/debug/patients",
-            "all_appointments": "/debug/appointments"
+            "all_appointments": "/debug/appointments",
+            "rebuild_stats": "/debug/stats/rebuild",
+            "faults": "/debug/faults",
+            "archive": "/debug/archive",
+            "tenants": "/debug/tenants",
+            "isolation": "/debug/isolation",
+            "migrations": "/debug/migrations",
+            "profile": "/debug/profile"
         }
-    }
+    return info
 
 @app.get("/health")
 async def health_check():
@@ -121,9 +157,22 @@ if __name__ == "__main__":
     port = int(os.getenv("FAKE_CARECLOUD_PORT", "7000"))
     debug = os.getenv("FAKE_CARECLOUD_DEBUG", "false").lower() == "true"
     
+    # HTTP server tuning; "auto" uses httptools and uvloop when they are installed
+    limit_concurrency = os.getenv("FAKE_CARECLOUD_LIMIT_CONCURRENCY")
+    server_settings = {
+        "http": os.getenv("FAKE_CARECLOUD_HTTP", "auto"),
+        "loop": os.getenv("FAKE_CARECLOUD_LOOP", "auto"),
+        "backlog": int(os.getenv("FAKE_CARECLOUD_BACKLOG", "2048")),
+        "timeout_keep_alive": int(os.getenv("FAKE_CARECLOUD_KEEP_ALIVE", "5")),
+        "limit_concurrency": int(limit_concurrency) if limit_concurrency else None,
+        "access_log": os.getenv("FAKE_CARECLOUD_ACCESS_LOG", "true").lower() == "true",
+    }
+    
+    configure_logging()
     logger.info(f"Starting Fake CareCloud API server on {host}:{port}")
     logger.info(f"Debug mode: {debug}")
     logger.info(f"Log file: fake_carecloud.log")
+    logger.info(f"Server settings: {server_settings}")
     
     # Create custom log config to ensure access logs go to our handlers
     log_config = {
@@ -165,6 +214,6 @@ if __name__ == "__main__":
     }
     
     if debug:
-        uvicorn.run("app:app", host=host, port=port, reload=True, log_config=log_config)
+        uvicorn.run("app:app", host=host, port=port, reload=True, log_config=log_config, **server_settings)
     else:
-        uvicorn.run(app, host=host, port=port, reload=False, log_config=log_config)
\ No newline at end of file
+        uvicorn.run(app, host=host, port=port, reload=False, log_config=log_config, **server_settings)
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""Appointment status state machine.
+
+New appointments are ``scheduled``, which is also the queue of appointments
+pending confirmation. From there they are confirmed, checked in (arrived)
+and completed, or end as a no-show or cancelled.
+"""
+
+from typing import Optional, get_args
+from schemas import AppointmentStatus
+
+STATUSES = get_args(AppointmentStatus)
+
+SCHEDULED = "scheduled"
+CANCELLED = "cancelled"
+
+# Appointments that haven't happened yet; series edits and cancellations apply to these
+OPEN_STATUSES = ("scheduled", "confirmed")
+
+# status -> statuses it can change to; the last three are final
+TRANSITIONS = {
+    "scheduled": {"confirmed", "arrived", "no_show", "cancelled"},
+    "confirmed": {"arrived", "no_show", "cancelled"},
+    "arrived": {"completed"},
+    "completed": set(),
+    "no_show": set(),
+    "cancelled": set(),
+}
+
+
+def transition_error(current: str, new: str) -> Optional[str]:
+    """Why an appointment in ``current`` can't move to ``new``, or None when it can."""
+    if new not in TRANSITIONS:
+        return f"Unknown status {new!r}, expected one of {', '.join(STATUSES)}"
+    # Statuses written before the state machine existed can move anywhere
+    if current not in TRANSITIONS or new in TRANSITIONS[current]:
+        return None
+    allowed = ", ".join(sorted(TRANSITIONS[current])) or "none, it is final"
+    return f"Cannot change appointment status from {current} to {new} (allowed: {allowed})"
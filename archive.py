@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import DateTime, delete, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from database import default_database, tenant_databases
+from models import Appointment, ArchivedAppointment
+
+logger = logging.getLogger("fake_carecloud.archive")
+
+# Appointments that ended this many days ago (or are cancelled) move to the archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("FAKE_CARECLOUD_ARCHIVE_AFTER_DAYS", "30"))
+
+# Seconds between archiving runs; 0 disables the background job
+ARCHIVE_INTERVAL = int(os.getenv("FAKE_CARECLOUD_ARCHIVE_INTERVAL", "3600"))
+
+# Rows moved per transaction, so writers are never blocked for long
+BATCH_SIZE = 5000
+
+COLUMNS = [column.name for column in Appointment.__table__.columns]
+
+
+def _move(db: Session, source, target, ids, extra: Optional[dict] = None):
+    source_columns = [source.__table__.c[name] for name in COLUMNS]
+    target_columns = [target.__table__.c[name] for name in COLUMNS]
+    if extra:
+        source_columns += list(extra.values())
+        target_columns += [target.__table__.c[name] for name in extra]
+    db.execute(insert(target).from_select(
+        target_columns,
+        select(*source_columns).where(source.id.in_(ids))
+    ))
+    db.execute(delete(source).where(source.id.in_(ids)))
+
+
+def archive_appointments(db: Session, now: Optional[datetime] = None) -> int:
+    """Move cancelled and long-past appointments to archived_appointments. Returns the count."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=ARCHIVE_AFTER_DAYS)
+    condition = or_(Appointment.status == "cancelled", Appointment.end_time < cutoff)
+
+    archived = 0
+    while True:
+        ids = db.scalars(select(Appointment.id).where(condition).limit(BATCH_SIZE)).all()
+        if not ids:
+            break
+        _move(db, Appointment, ArchivedAppointment, ids, {"archived_at": literal(now, DateTime)})
+        db.commit()
+        archived += len(ids)
+
+    if archived:
+        logger.info(f"Archived {archived} appointments")
+    return archived
+
+
+def get_archived_appointment(db: Session, appointment_id: str) -> Optional[ArchivedAppointment]:
+    return db.query(ArchivedAppointment).filter(ArchivedAppointment.id == appointment_id).first()
+
+
+def restore_appointment(db: Session, appointment_id: str) -> Optional[Appointment]:
+    """Move an archived appointment back to the active table (before it is modified)."""
+    if get_archived_appointment(db, appointment_id) is None:
+        return None
+    _move(db, ArchivedAppointment, Appointment, [appointment_id])
+    db.flush()
+    return db.query(Appointment).filter(Appointment.id == appointment_id).first()
+
+
+def run_archive(database=None):
+    db = (database or default_database).SessionLocal()
+    try:
+        return archive_appointments(db)
+    finally:
+        db.close()
+
+
+async def archive_periodically():
+    """Background job started from the lifespan hook.
+
+    Covers the main database and every tenant database that is currently open.
+    Closed tenants saw no traffic since, so they have nothing new to archive
+    until they are opened again.
+    """
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+        for database in [default_database] + tenant_databases.open_databases():
+            try:
+                await asyncio.to_thread(run_archive, database)
+            except Exception:
+                logger.exception(f"Archiving appointments failed for {database.tenant or 'the main database'}")
+        tenant_databases.sweep()
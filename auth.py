@@ -2,19 +2,22 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from models import AuthToken
-from database import get_db
+from database import get_read_db, current_tenant
 from datetime import datetime, timedelta
 import secrets
+from tenancy import tenant_token
 
 security = HTTPBearer()
 
+ACCESS_TOKEN_LIFETIME = timedelta(hours=1)
+
 def generate_access_token() -> str:
     return secrets.token_urlsafe(32)
 
 def create_access_token(db: Session) -> str:
-    # Generate new token
-    access_token = generate_access_token()
-    expires_at = datetime.utcnow() + timedelta(hours=1)
+    # Generate new token (prefixed with the tenant, so the token alone identifies it)
+    access_token = tenant_token(current_tenant.get(), generate_access_token())
+    expires_at = datetime.utcnow() + ACCESS_TOKEN_LIFETIME
     
     # Remove old tokens
     db.query(AuthToken).delete()
@@ -29,16 +32,16 @@ def create_access_token(db: Session) -> str:
     
     return access_token
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    token = credentials.credentials
-    
+def is_valid_token(db: Session, token: str) -> bool:
     # Check if token exists and is not expired
     db_token = db.query(AuthToken).filter(
         AuthToken.access_token == token,
         AuthToken.expires_at > datetime.utcnow()
     ).first()
-    
-    if not db_token:
+    return db_token is not None
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_read_db)):
+    if not is_valid_token(db, credentials.credentials):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
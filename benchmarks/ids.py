@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark patient and appointment inserts and keyset pagination with random
+(uuid4) and time-ordered (uuid7) IDs, stored as text or as 16-byte BLOBs.
+
+Each combination runs in its own process against a new database file, since
+ID generation and storage are configured at import.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VARIANTS = (
+    ("uuid4", False),
+    ("uuid4", True),
+    ("uuid7", False),
+    ("uuid7", True),
+)
+
+
+def measure(patients, batch_size):
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import Session
+    from bootstrap import bootstrap_database
+    from database import default_database
+    from ids import new_id
+    from models import Appointment, Patient
+    from projections import PATIENT_COLUMNS
+
+    bootstrap_database()
+    engine = default_database.engine
+    first_day = date(1940, 1, 1)
+    first_start = datetime(2026, 1, 5, 8, 0)
+
+    # One transaction per batch, like the importer's default
+    started = time.perf_counter()
+    for offset in range(0, patients, batch_size):
+        count = min(batch_size, patients - offset)
+        patient_rows = [
+            {
+                "id": new_id(),
+                "first_name": f"First{n % 5000}",
+                "last_name": f"Last{n % 20000}",
+                "date_of_birth": first_day + timedelta(days=n % 30000),
+            }
+            for n in range(offset, offset + count)
+        ]
+        appointment_rows = [
+            {
+                "id": new_id(),
+                "start_time": first_start + timedelta(minutes=15 * n),
+                "end_time": first_start + timedelta(minutes=15 * n + 15),
+                "provider_id": 1,
+                "location_id": 1,
+                "visit_reason_id": 1,
+                "resource_id": 1,
+                "patient_id": patient["id"],
+                "status": "scheduled",
+                "created_at": first_start,
+                "updated_at": first_start,
+            }
+            for n, patient in enumerate(patient_rows, offset)
+        ]
+        with engine.begin() as connection:
+            connection.execute(insert(Patient), patient_rows)
+            connection.execute(insert(Appointment), appointment_rows)
+    insert_seconds = time.perf_counter() - started
+
+    # Walk every patient a page at a time, as GET /v2/patients does
+    started = time.perf_counter()
+    with Session(engine) as db:
+        after = None
+        while True:
+            query = select(*PATIENT_COLUMNS)
+            if after:
+                query = query.where(Patient.id > after)
+            rows = db.execute(query.order_by(Patient.id).limit(1000)).all()
+            if not rows:
+                break
+            after = rows[-1].id
+    page_seconds = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    click.echo(f"{insert_seconds:.3f} {page_seconds:.3f}")
+
+
+@click.command()
+@click.option("--patients", default=200000, show_default=True, help="Patients to insert (with one appointment each)")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per transaction")
+@click.option("--measure", "variant", hidden=True)
+def main(patients, batch_size, variant):
+    """Compare insert throughput, database size and keyset paging across ID formats and storage."""
+
+    if variant:
+        measure(patients, batch_size)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for id_format, binary in VARIANTS:
+            path = os.path.join(tmp, f"{id_format}-{binary}.db")
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{path}",
+                FAKE_CARECLOUD_ID_FORMAT=id_format,
+                FAKE_CARECLOUD_BINARY_IDS=str(binary).lower(),
+            )
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--patients", str(patients),
+                 "--batch-size", str(batch_size), "--measure", "1"],
+                cwd=tmp, env=env, check=True, capture_output=True, text=True,
+            ).stdout.split()
+            insert_seconds, page_seconds = float(output[-2]), float(output[-1])
+            size = os.path.getsize(path)
+            storage = "binary" if binary else "text"
+            click.echo(
+                f"{id_format} {storage:6}  insert {2 * patients / insert_seconds:9,.0f} rows/s  "
+                f"page through patients {page_seconds * 1000:7.1f} ms  database {size / 1e6:6.1f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark isolated databases (X-Isolation-ID) under many parallel test workers.
+
+Starts the server, then runs ``--workers`` threads that each play a test
+suite: every test takes a new isolation ID, gets a token (which creates the
+database from the template), creates a patient, checks it is the only one,
+and discards the database.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from startup import ROOT, free_port, wait_for_health  # noqa: E402
+
+PATIENT = {
+    "patient": {"first_name": "Isolated", "last_name": "Patient", "date_of_birth": "1990-01-01"},
+    "addresses": [],
+    "phones": [],
+}
+
+
+def run_test(http: httpx.Client, isolation_id: str) -> float:
+    """One test; returns how long getting a fresh dataset (the first request) took."""
+    started = time.perf_counter()
+    response = http.post(
+        "/oauth2/access_token",
+        data={"grant_type": "refresh_token", "refresh_token": "dummy"},
+        headers={"X-Isolation-ID": isolation_id},
+    )
+    response.raise_for_status()
+    fresh = time.perf_counter() - started
+
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    http.post("/v2/patients", json=PATIENT, headers=headers).raise_for_status()
+    patients = http.get("/v2/patients", headers=headers).json()["patients"]
+    if len(patients) != 1:
+        raise RuntimeError(f"{isolation_id} sees {len(patients)} patients; data leaked between databases")
+    http.delete(f"/debug/isolation/{isolation_id}").raise_for_status()
+    return fresh
+
+
+@click.command()
+@click.option("--workers", default=100, show_default=True, help="Parallel test workers")
+@click.option("--tests", default=20, show_default=True, help="Tests per worker")
+@click.option("--template", help="FAKE_CARECLOUD_ISOLATION_TEMPLATE for the server (default: a seeded database)")
+@click.option("--timeout", default=30.0, show_default=True, help="Seconds to wait for /health")
+def main(workers, tests, template, timeout):
+    """Measure fresh-database latency and test throughput with many workers on one server."""
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/default.db", FAKE_CARECLOUD_ISOLATION="true")
+        if template:
+            env["FAKE_CARECLOUD_ISOLATION_TEMPLATE"] = template
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_health(port, process, timeout)
+            local = threading.local()
+
+            def worker(number):
+                if not hasattr(local, "http"):
+                    local.http = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60)
+                return [run_test(local.http, f"worker{number}-test{test}") for test in range(tests)]
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(workers) as executor:
+                fresh = [timing for timings in executor.map(worker, range(workers)) for timing in timings]
+            elapsed = time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait()
+
+    fresh.sort()
+    click.echo(f"{workers} workers x {tests} tests: {len(fresh) / elapsed:,.0f} tests/s")
+    click.echo(
+        f"fresh database (first request): median {statistics.median(fresh) * 1000:.1f} ms  "
+        f"p99 {fresh[int(len(fresh) * 0.99) - 1] * 1000:.1f} ms"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of a patient search that matches every patient, comparing
+loading full ORM objects (the previous implementation) with the column
+projection used by POST /v2/patients/search.
+
+Each measurement runs in its own process so peak RSS is not shared.
+"""
+
+import asyncio
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(database_url, path, patients):
+    subprocess.run(
+        [sys.executable, "-c", "from bootstrap import bootstrap_database; bootstrap_database()"],
+        cwd=ROOT, env=dict(os.environ, DATABASE_URL=database_url), check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    rng = random.Random(0)
+    first_day = date(1940, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO patients (id, first_name, last_name, date_of_birth) VALUES (?, ?, ?, ?)",
+        (
+            (f"{n:032x}", f"First{n % 5000}", f"Last{n % 20000}", (first_day + timedelta(days=rng.randrange(30000))).isoformat())
+            for n in range(patients)
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+def search_orm(db):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from models import Patient
+    from schemas import PatientResponse, PatientSearchResponse
+
+    patients = db.query(Patient).all()
+    response = PatientSearchResponse(patients=[
+        PatientResponse(
+            id=patient.id,
+            first_name=patient.first_name,
+            last_name=patient.last_name,
+            date_of_birth=patient.date_of_birth
+        )
+        for patient in patients
+    ])
+    return JSONResponse(jsonable_encoder(response))
+
+
+def search_projection(db):
+    from routers.patients import search_patients
+    from schemas import PatientCreate, PatientSearchRequest
+
+    request = PatientSearchRequest(fields=PatientCreate(first_name="", last_name="", date_of_birth=""))
+    return asyncio.run(search_patients(request, db, True))
+
+
+def measure(mode):
+    from database import SessionLocal
+    import models  # noqa: F401
+    import routers.patients  # noqa: F401
+
+    baseline = peak_rss_mb()
+    db = SessionLocal()
+    started = time.perf_counter()
+    response = (search_orm if mode == "orm" else search_projection)(db)
+    elapsed = time.perf_counter() - started
+    db.close()
+    click.echo(f"{peak_rss_mb() - baseline:.1f} {elapsed:.3f} {len(response.body)}")
+
+
+@click.command()
+@click.option("--patients", default=200000, show_default=True, help="Number of patients in the database")
+@click.option("--measure", "mode", type=click.Choice(["orm", "projection"]), hidden=True)
+def main(patients, mode):
+    """Compare peak RSS growth of ORM-object and column-projection patient searches."""
+
+    if mode:
+        measure(mode)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memory.db")
+        database_url = f"sqlite:///{path}"
+        populate(database_url, path, patients)
+
+        for mode in ("orm", "projection"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", mode],
+                cwd=tmp, env=dict(os.environ, DATABASE_URL=database_url),
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            peak, elapsed, size = float(output[-3]), float(output[-2]), int(output[-1])
+            click.echo(f"{mode:11} peak RSS +{peak:8.1f} MB  {elapsed * 1000:8.1f} ms  response {size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
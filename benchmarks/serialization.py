@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark serializing large patient and appointment lists three ways:
+
+- response_model: ORM objects validated through the response models and
+  dumped again (what ``response_model=List[...]`` with from_attributes does)
+- dicts: column rows turned into dicts and encoded by JSONResponse
+- adapter: column rows serialized by the prebuilt TypeAdapters in serialization.py
+
+Times include the query. Each run uses a fresh in-memory database.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import List
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def populate(engine, rows):
+    from models import Appointment, Patient
+
+    first_day = date(1940, 1, 1)
+    first_start = datetime(2026, 1, 5, 8, 0)
+    patient_ids = [str(uuid.uuid4()) for _ in range(rows)]
+    with engine.begin() as connection:
+        connection.execute(Patient.__table__.insert(), [
+            {
+                "id": patient_id,
+                "first_name": f"First{n % 5000}",
+                "last_name": f"Last{n % 20000}",
+                "date_of_birth": first_day + timedelta(days=n % 30000),
+            }
+            for n, patient_id in enumerate(patient_ids)
+        ])
+        connection.execute(Appointment.__table__.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "start_time": first_start + timedelta(minutes=15 * n),
+                "end_time": first_start + timedelta(minutes=15 * n + 15),
+                "provider_id": 1 + n % 10,
+                "location_id": 1,
+                "visit_reason_id": 1,
+                "resource_id": 1,
+                "patient_id": patient_id,
+                "status": "scheduled",
+                "created_at": first_start,
+                "updated_at": first_start,
+            }
+            for n, patient_id in enumerate(patient_ids)
+        ])
+
+
+def serializers(kind):
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from models import Appointment, Patient
+    from projections import APPOINTMENT_COLUMNS, PATIENT_COLUMNS, appointment_to_dict, patient_to_dict
+    from schemas import AppointmentResponse, PatientResponse
+    import serialization
+
+    model, response, columns, to_dict, serializer = {
+        "patients": (Patient, PatientResponse, PATIENT_COLUMNS, patient_to_dict, serialization.PATIENTS),
+        "appointments": (Appointment, AppointmentResponse, APPOINTMENT_COLUMNS, appointment_to_dict, serialization.APPOINTMENTS),
+    }[kind]
+    response_adapter = TypeAdapter(List[response])
+
+    def response_model(db):
+        objects = db.query(model).all()
+        return response_adapter.dump_json(response_adapter.validate_python(objects, from_attributes=True))
+
+    def dicts(db):
+        return JSONResponse([to_dict(row) for row in db.execute(select(*columns))]).body
+
+    def adapter(db):
+        return serializer.dump_json(db.execute(select(*columns)))
+
+    return {"response_model": response_model, "dicts": dicts, "adapter": adapter}
+
+
+@click.command()
+@click.option("--rows", "sizes", multiple=True, type=int, default=(10000, 100000), show_default=True,
+              help="List sizes to benchmark (repeatable)")
+@click.option("--repeat", default=3, show_default=True, help="Runs per measurement; the best is reported")
+def main(sizes, repeat):
+    """Compare serialization time of large list responses."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    import models  # noqa: F401
+
+    for rows in sizes:
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        populate(engine, rows)
+
+        for kind in ("patients", "appointments"):
+            bodies = {}
+            for name, serialize in serializers(kind).items():
+                best = None
+                for _ in range(repeat):
+                    with Session(engine) as db:
+                        started = time.perf_counter()
+                        bodies[name] = serialize(db)
+                        elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                click.echo(f"{rows:>7} {kind:12} {name:14} {best * 1000:8.1f} ms  {len(bodies[name]) / 1e6:6.1f} MB")
+            if json.loads(bodies["dicts"]) != json.loads(bodies["adapter"]):
+                raise click.ClickException(f"{kind}: adapter output differs from the dicts output")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark how long the fake CareCloud API takes from process start to the
+first successful /health response.
+"""
+
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_health(port, process, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.002)
+    raise RuntimeError("Server did not become healthy in time")
+
+
+def start_once(database_url, env_overrides, timeout):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, **env_overrides)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_health(port, process, timeout)
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@click.command()
+@click.option("--runs", default=10, show_default=True, help="Number of starts per scenario")
+@click.option("--no-ui", is_flag=True, help="Disable the UI routers (FAKE_CARECLOUD_ENABLE_UI=false)")
+@click.option("--no-debug", is_flag=True, help="Disable the debug routers (FAKE_CARECLOUD_ENABLE_DEBUG=false)")
+@click.option("--timeout", default=30.0, show_default=True, help="Seconds to wait for /health")
+def main(runs, no_ui, no_debug, timeout):
+    """Measure cold start (new database) and warm start (existing database) to first /health."""
+
+    env_overrides = {}
+    if no_ui:
+        env_overrides["FAKE_CARECLOUD_ENABLE_UI"] = "false"
+    if no_debug:
+        env_overrides["FAKE_CARECLOUD_ENABLE_DEBUG"] = "false"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cold, warm = [], []
+        for run in range(runs):
+            database_url = f"sqlite:///{tmp}/cold-{run}.db"
+            cold.append(start_once(database_url, env_overrides, timeout))
+            warm.append(start_once(database_url, env_overrides, timeout))
+
+    for name, timings in (("cold (new database)", cold), ("warm (existing database)", warm)):
+        click.echo(
+            f"{name:26} min {min(timings) * 1000:7.1f} ms  "
+            f"median {statistics.median(timings) * 1000:7.1f} ms  "
+            f"max {max(timings) * 1000:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import logging
+import time
+from sqlalchemy import inspect, text
+from database import Base, default_database
+
+logger = logging.getLogger("fake_carecloud")
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FILE = 'fake_carecloud.log'
+
+_logging_configured = False
+
+
+def configure_logging():
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+    # Configure uvicorn access and error logging to use our handlers
+    for name in ("uvicorn.access", "uvicorn.error"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        for handler in logging.getLogger().handlers:
+            uvicorn_logger.addHandler(handler)
+
+
+def is_initialized(engine) -> bool:
+    """True when every table already exists, so create_all can be skipped."""
+    return set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+
+
+def is_bootstrapped(database) -> bool:
+    """True when the database is at the latest schema version (one PRAGMA read).
+
+    Every migration, including each batch of new indexes, bumps the version,
+    and seeding follows the migrations in the same bootstrap, so a database
+    at the latest version needs no setup.
+    """
+    from ids import check_id_storage
+    from migrations import LATEST_VERSION
+
+    with database.engine.connect() as connection:
+        if connection.execute(text("PRAGMA user_version")).scalar() != LATEST_VERSION:
+            return False
+        check_id_storage(connection)
+    return True
+
+
+def bootstrap_database(database=None):
+    """Create tables, seed data and counters. Cheap when the database is already set up.
+
+    Defaults to the main database; tenant databases are bootstrapped when first opened.
+    Indexes missing from an existing database are then built, in the background
+    unless FAKE_CARECLOUD_ONLINE_INDEX_BUILDS is false.
+    """
+    import models  # noqa: F401 - registers the tables on Base.metadata
+    from ids import check_id_storage
+    from migrations import run_migrations, start_index_builds
+    from seed_data import create_seed_data
+    from stats import ensure_counters
+
+    database = database or default_database
+    engine = database.engine
+    started = time.perf_counter()
+
+    if is_initialized(engine):
+        logger.info("Database tables already exist")
+    else:
+        Base.metadata.create_all(bind=engine)
+        logger.info("Database tables created")
+
+    run_migrations(engine)
+    with engine.connect() as connection:
+        check_id_storage(connection)
+
+    db = database.SessionLocal()
+    try:
+        create_seed_data(db)
+        ensure_counters(db)
+    finally:
+        db.close()
+
+    name = f"Tenant {database.tenant} database" if database.tenant else "Database"
+    logger.info(f"{name} ready in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    start_index_builds(database)
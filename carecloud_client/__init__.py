@@ -0,0 +1,24 @@
+"""Python client for the fake CareCloud API."""
+
+from .client import AsyncCareCloudClient, CareCloudError, get_access_token
+from .models import (
+    AppointmentCreate, AppointmentPatient, AppointmentSeriesUpdate, PatientAddress, PatientCreate,
+    PatientPhone, PatientRequest
+)
+from .tokens import DEFAULT_CACHE_PATH, TokenCache, TokenError
+
+__all__ = [
+    "AppointmentCreate",
+    "AppointmentPatient",
+    "AppointmentSeriesUpdate",
+    "AsyncCareCloudClient",
+    "CareCloudError",
+    "DEFAULT_CACHE_PATH",
+    "PatientAddress",
+    "PatientCreate",
+    "PatientPhone",
+    "PatientRequest",
+    "TokenCache",
+    "TokenError",
+    "get_access_token",
+]
@@ -0,0 +1,250 @@
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Iterable, List, Optional, Sequence
+import httpx
+from .models import (
+    PatientRequest, PatientCreate, PatientCreateResponse, PatientSearchRequest,
+    PatientSearchResponse, PatientListResponse, PatientResponse, PatientRecordResponse,
+    PatientBatchGetRequest, PatientBatchGetResponse,
+    ProvidersResponse, ProviderResponse, LocationsResponse, LocationResponse,
+    AppointmentResourceResponse, VisitReasonResponse,
+    AppointmentRequest, AppointmentCreate, AppointmentCreateResponse, AppointmentResponse,
+    AppointmentStatusUpdate, AppointmentListResponse,
+    AppointmentSeriesRequest, AppointmentSeriesCreateResponse, AppointmentSeriesUpdate,
+    AppointmentSeriesUpdateResponse, AppointmentSeriesResponse,
+    StatsResponse
+)
+from .tokens import DEFAULT_CACHE_PATH, TokenCache
+
+
+class CareCloudError(Exception):
+    """Raised when the API answers with an error status."""
+
+    def __init__(self, response: httpx.Response):
+        try:
+            detail = response.json().get("detail")
+        except ValueError:
+            detail = response.text
+        super().__init__(f"HTTP {response.status_code}: {detail}")
+        self.response = response
+        self.status_code = response.status_code
+        self.detail = detail
+
+
+class AsyncCareCloudClient:
+    """Async client for the (fake) CareCloud API.
+
+    Requests share one pooled connection set; the access token is cached and
+    refreshed only near expiry, or once when the server rejects it.
+
+        async with AsyncCareCloudClient("http://127.0.0.1:7000") as client:
+            providers = await client.get_providers()
+
+    With ``isolation`` (a pytest-xdist worker ID, say) every request goes to
+    an ephemeral database of that name, so parallel test runs don't share data.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:7000",
+        max_connections: int = 50,
+        timeout: float = 30,
+        token_cache: Optional[TokenCache] = None,
+        token_cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+        refresh_token: str = "dummy",
+        tenant: Optional[str] = None,
+        isolation: Optional[str] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        # Tokens of an isolated database die with it, so they aren't cached on disk
+        self.tokens = token_cache or TokenCache(
+            self.base_url, path=None if isolation else token_cache_path, refresh_token=refresh_token, tenant=tenant
+        )
+        headers = {}
+        if tenant:
+            headers["X-Tenant-ID"] = tenant
+        if isolation:
+            headers["X-Isolation-ID"] = isolation
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers or None,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def access_token(self, force: bool = False) -> str:
+        return await self.tokens.aget(self.http, force=force)
+
+    async def request(self, method: str, path: str, idempotency_key: Optional[str] = None, **kwargs) -> Any:
+        """Send an authenticated request and return the decoded JSON body."""
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        token = await self.access_token()
+        response = await self.http.request(method, path, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            # Another client may have minted a token, which revokes ours
+            self.tokens.invalidate(token)
+            token = await self.access_token()
+            response = await self.http.request(method, path, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code >= 400:
+            raise CareCloudError(response)
+        return response.json()
+
+    async def gather(self, calls: Iterable[Awaitable], concurrency: Optional[int] = None) -> List[Any]:
+        """Run many calls concurrently (at most ``concurrency`` at a time), keeping their order."""
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def run(call):
+            async with semaphore:
+                return await call
+
+        return await asyncio.gather(*(run(call) for call in calls))
+
+    # Patients
+
+    async def create_patient(self, patient: PatientRequest, idempotency_key: Optional[str] = None) -> str:
+        data = await self.request("POST", "/v2/patients", idempotency_key=idempotency_key, json=patient.model_dump())
+        return PatientCreateResponse(**data).patient
+
+    async def search_patients(self, fields: PatientCreate) -> List[PatientResponse]:
+        data = await self.request("POST", "/v2/patients/search", json=PatientSearchRequest(fields=fields).model_dump())
+        return PatientSearchResponse(**data).patients
+
+    async def get_patient(self, patient_id: str) -> PatientResponse:
+        return PatientResponse(**await self.request("GET", f"/v2/patients/{patient_id}"))
+
+    async def get_patient_record(
+        self, patient_id: str, expand: Sequence[str] = ("addresses", "phones", "appointments")
+    ) -> PatientRecordResponse:
+        """A patient with the ``expand``ed addresses, phones and appointments, in one request."""
+        params = {"expand": ",".join(expand)} if expand else None
+        return PatientRecordResponse(**await self.request("GET", f"/v2/patients/{patient_id}", params=params))
+
+    async def batch_get_patients(
+        self, patient_ids: Sequence[str], expand: Sequence[str] = ()
+    ) -> PatientBatchGetResponse:
+        """Many patients in one request (up to 1000 IDs); unknown IDs are listed in ``not_found``."""
+        body = PatientBatchGetRequest(ids=list(patient_ids), expand=list(expand)).model_dump()
+        return PatientBatchGetResponse(**await self.request("POST", "/v2/patients/batch_get", json=body))
+
+    async def list_patients(self, after: Optional[str] = None, limit: int = 100) -> PatientListResponse:
+        """One page of patients in ID order; pass ``next`` back as ``after`` for the next page."""
+        params = {"after": after, "limit": limit} if after else {"limit": limit}
+        return PatientListResponse(**await self.request("GET", "/v2/patients", params=params))
+
+    async def iter_patients(self, limit: int = 100) -> AsyncIterator[PatientResponse]:
+        """Every patient, following the page cursors."""
+        after = None
+        while True:
+            page = await self.list_patients(after=after, limit=limit)
+            for patient in page.patients:
+                yield patient
+            if page.next is None:
+                return
+            after = page.next
+
+    # Providers and reference data
+
+    async def get_providers(self) -> List[ProviderResponse]:
+        return ProvidersResponse(**await self.request("GET", "/v2/providers")).providers
+
+    async def get_locations(self) -> List[LocationResponse]:
+        return LocationsResponse(**await self.request("GET", "/v2/locations")).locations
+
+    async def get_appointment_resources(self) -> List[AppointmentResourceResponse]:
+        return [AppointmentResourceResponse(**item) for item in await self.request("GET", "/v2/appointment_resources")]
+
+    async def get_visit_reasons(self) -> List[VisitReasonResponse]:
+        return [VisitReasonResponse(**item) for item in await self.request("GET", "/v2/visit_reasons")]
+
+    # Appointments
+
+    async def create_appointment(self, appointment: AppointmentCreate, idempotency_key: Optional[str] = None) -> str:
+        body = AppointmentRequest(appointment=appointment).model_dump()
+        data = await self.request("POST", "/v2/appointments", idempotency_key=idempotency_key, json=body)
+        return AppointmentCreateResponse(**data).appointment
+
+    async def get_appointment(self, appointment_id: str) -> AppointmentResponse:
+        return AppointmentResponse(**await self.request("GET", f"/v2/appointments/{appointment_id}"))
+
+    async def update_appointment(self, appointment_id: str, appointment: AppointmentCreate) -> AppointmentResponse:
+        body = AppointmentRequest(appointment=appointment).model_dump()
+        return AppointmentResponse(**await self.request("PUT", f"/v2/appointments/{appointment_id}", json=body))
+
+    async def cancel_appointment(self, appointment_id: str) -> str:
+        return (await self.request("DELETE", f"/v2/appointments/{appointment_id}"))["message"]
+
+    async def change_appointment_status(self, appointment_id: str, status: str) -> AppointmentResponse:
+        """Move an appointment to ``status`` (confirmed, arrived, completed, no_show or cancelled)."""
+        body = AppointmentStatusUpdate(status=status).model_dump()
+        return AppointmentResponse(**await self.request("POST", f"/v2/appointments/{appointment_id}/status", json=body))
+
+    async def list_appointments(
+        self, status: Optional[str] = None, after: Optional[str] = None, limit: int = 100, **filters
+    ) -> AppointmentListResponse:
+        """One page of appointments in start time order; pass ``next`` back as ``after`` for the next page."""
+        params = {"status": status, "after": after, "limit": limit, **filters}
+        params = {name: value for name, value in params.items() if value is not None}
+        return AppointmentListResponse(**await self.request("GET", "/v2/appointments", params=params))
+
+    async def iter_appointments(self, status: Optional[str] = None, limit: int = 100, **filters) -> AsyncIterator[AppointmentResponse]:
+        """Every matching appointment, following the page cursors (e.g. a worker draining a status queue)."""
+        after = None
+        while True:
+            page = await self.list_appointments(status, after=after, limit=limit, **filters)
+            for appointment in page.appointments:
+                yield appointment
+            if page.next is None:
+                return
+            after = page.next
+
+    # Recurring series
+
+    async def create_appointment_series(
+        self, appointment: AppointmentCreate, recurrence: str, idempotency_key: Optional[str] = None
+    ) -> AppointmentSeriesCreateResponse:
+        """Book every occurrence of ``recurrence`` (e.g. "FREQ=WEEKLY;BYDAY=MO,TH;COUNT=16") at once."""
+        body = AppointmentSeriesRequest(appointment=appointment, recurrence=recurrence).model_dump()
+        data = await self.request("POST", "/v2/appointment_series", idempotency_key=idempotency_key, json=body)
+        return AppointmentSeriesCreateResponse(**data)
+
+    async def get_appointment_series(self, series_id: str) -> AppointmentSeriesResponse:
+        return AppointmentSeriesResponse(**await self.request("GET", f"/v2/appointment_series/{series_id}"))
+
+    async def update_appointment_series(self, series_id: str, changes: AppointmentSeriesUpdate) -> AppointmentSeriesUpdateResponse:
+        body = changes.model_dump(exclude_none=True)
+        return AppointmentSeriesUpdateResponse(**await self.request("PUT", f"/v2/appointment_series/{series_id}", json=body))
+
+    async def cancel_appointment_series(self, series_id: str) -> int:
+        """Cancel the series' open occurrences; returns how many were cancelled."""
+        return (await self.request("DELETE", f"/v2/appointment_series/{series_id}"))["cancelled"]
+
+    # Statistics
+
+    async def get_stats(self) -> StatsResponse:
+        return StatsResponse(**await self.request("GET", "/v2/stats"))
+
+
+def get_access_token(
+    base_url: str,
+    grant_type: str = "refresh_token",
+    refresh_token: str = "dummy",
+    force: bool = False,
+    token_cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+    tenant: Optional[str] = None,
+) -> str:
+    """Return a cached access token, requesting a new one only when needed."""
+    cache = TokenCache(
+        base_url, path=token_cache_path, grant_type=grant_type, refresh_token=refresh_token, tenant=tenant
+    )
+    with httpx.Client(base_url=base_url.rstrip("/")) as http:
+        return cache.get(http, force=force)
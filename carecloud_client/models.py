@@ -0,0 +1,229 @@
+"""Request and response bodies of the CareCloud API, as the client sends and reads them.
+
+These mirror the server's schemas.py but are kept separate, so the client
+package imports on its own (it only needs httpx and pydantic).
+"""
+
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from datetime import date, datetime
+
+# Provider Models
+class ProviderSpecialty(BaseModel):
+    name: str
+    taxonomy: str
+
+class ProviderResponse(BaseModel):
+    id: int
+    npi: Optional[str] = None
+    name: str
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    specialty: ProviderSpecialty
+    last_name: Optional[str] = None
+    first_name: Optional[str] = None
+
+class ProvidersResponse(BaseModel):
+    providers: List[ProviderResponse]
+
+# Location Models
+class LocationAddress(BaseModel):
+    line1: Optional[str] = None
+    line2: Optional[str] = None
+    line3: Optional[str] = None
+    city: Optional[str] = None
+    zip_code: Optional[str] = None
+    county_fips: Optional[str] = None
+    county_name: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    state_name: Optional[str] = None
+    country_name: Optional[str] = None
+
+class LocationPhone(BaseModel):
+    phone_number: str
+    phone_type: str
+    phone_ext: Optional[str] = None
+    is_primary: bool
+
+class LocationResponse(BaseModel):
+    id: int
+    name: str
+    is_visible_appointment_scheduler: bool
+    place_of_service_code: Optional[str] = None
+    address: LocationAddress
+    phones: List[LocationPhone]
+
+class LocationsResponse(BaseModel):
+    locations: List[LocationResponse]
+
+# Appointment Resource Models
+class AppointmentResourceDetail(BaseModel):
+    id: int
+    business_entity_id: str
+    name: str
+    code: Optional[str] = None
+    description: Optional[str] = None
+    status: str
+    sort_code: int
+    created_at: str
+    updated_at: str
+    created_by: Optional[int] = None
+    updated_by: Optional[int] = None
+    is_for_requests: bool
+    appointment_confirmation: str
+
+class AppointmentResourceResponse(BaseModel):
+    resource: AppointmentResourceDetail
+
+# Visit Reason Models
+class VisitReasonResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+
+# Patient Models
+class PatientAddress(BaseModel):
+    line1: str
+    line2: Optional[str] = ""
+    line3: Optional[str] = ""
+    city: str
+    state: str
+    zip_code: str
+    country_name: str = "USA"
+    is_primary: bool = True
+
+class PatientPhone(BaseModel):
+    phone_number: str
+    phone_type_code: str = "M"
+    extension: Optional[str] = ""
+    is_primary: bool = True
+
+class PatientCreate(BaseModel):
+    first_name: str
+    last_name: str
+    date_of_birth: str
+
+class PatientRequest(BaseModel):
+    patient: PatientCreate
+    addresses: List[PatientAddress]
+    phones: List[PatientPhone]
+
+class PatientResponse(BaseModel):
+    id: str
+    first_name: str
+    last_name: str
+    date_of_birth: date
+
+class PatientCreateResponse(BaseModel):
+    patient: str
+
+class PatientSearchRequest(BaseModel):
+    fields: PatientCreate
+
+class PatientSearchResponse(BaseModel):
+    patients: List[PatientResponse]
+
+class PatientListResponse(BaseModel):
+    patients: List[PatientResponse]
+    # Pass as ``after`` to get the next page; None on the last page
+    next: Optional[str] = None
+
+# Appointment Models
+AppointmentStatus = Literal["scheduled", "confirmed", "arrived", "completed", "no_show", "cancelled"]
+
+class AppointmentPatient(BaseModel):
+    id: str
+
+class AppointmentCreate(BaseModel):
+    start_time: str
+    end_time: str
+    provider_id: int
+    location_id: int
+    visit_reason_id: int
+    resource_id: int
+    patient: AppointmentPatient
+
+class AppointmentRequest(BaseModel):
+    appointment: AppointmentCreate
+
+class AppointmentResponse(BaseModel):
+    id: str
+    start_time: datetime
+    end_time: datetime
+    provider_id: int
+    location_id: int
+    visit_reason_id: int
+    resource_id: int
+    patient_id: str
+    status: str
+    series_id: Optional[str] = None
+
+class AppointmentCreateResponse(BaseModel):
+    appointment: str
+
+class AppointmentStatusUpdate(BaseModel):
+    status: AppointmentStatus
+
+class AppointmentListResponse(BaseModel):
+    appointments: List[AppointmentResponse]
+    # Pass as ``after`` to get the next page; None on the last page
+    next: Optional[str] = None
+
+# Appointment Series Models
+class AppointmentSeriesRequest(BaseModel):
+    # The first occurrence; the rest follow the rule with the same duration
+    appointment: AppointmentCreate
+    recurrence: str
+
+class AppointmentSeriesCreateResponse(BaseModel):
+    series: str
+    appointments: List[str]
+
+class AppointmentSeriesUpdate(BaseModel):
+    provider_id: Optional[int] = None
+    location_id: Optional[int] = None
+    visit_reason_id: Optional[int] = None
+    resource_id: Optional[int] = None
+
+class AppointmentSeriesUpdateResponse(BaseModel):
+    series: str
+    updated: int
+
+class AppointmentSeriesResponse(BaseModel):
+    id: str
+    recurrence: str
+    start_time: datetime
+    end_time: datetime
+    provider_id: int
+    location_id: int
+    visit_reason_id: int
+    resource_id: int
+    patient_id: str
+    status: str
+    appointments: List[AppointmentResponse]
+
+# Full Patient Record Models
+PatientExpansion = Literal["addresses", "phones", "appointments"]
+
+class PatientRecordResponse(PatientResponse):
+    # Present only when requested with expand
+    addresses: Optional[List[PatientAddress]] = None
+    phones: Optional[List[PatientPhone]] = None
+    appointments: Optional[List[AppointmentResponse]] = None
+
+class PatientBatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+    expand: List[PatientExpansion] = []
+
+class PatientBatchGetResponse(BaseModel):
+    patients: List[PatientRecordResponse]
+    not_found: List[str]
+
+# Statistics Models
+class StatsResponse(BaseModel):
+    totals: Dict[str, int]
+    appointments_per_day: Dict[str, int]
+    appointments_per_provider: Dict[str, int]
+    appointments_per_status: Dict[str, int]
+    patients_per_day: Dict[str, int]
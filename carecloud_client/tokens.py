@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+import httpx
+
+DEFAULT_CACHE_PATH = Path(os.getenv(
+    "FAKE_CARECLOUD_TOKEN_CACHE",
+    Path.home() / ".cache" / "fake_carecloud" / "tokens.json"
+))
+
+# Used when the server doesn't say how long a token lives
+DEFAULT_EXPIRES_IN = 3600
+
+
+class TokenError(Exception):
+    """Raised when an access token cannot be obtained."""
+
+    def __init__(self, message: str, response: Optional[httpx.Response] = None):
+        super().__init__(message)
+        self.response = response
+
+
+class TokenCache:
+    """Access tokens cached in memory and on disk, refreshed only near expiry.
+
+    Every token request revokes the previous token on the server, so the cache
+    also makes sure concurrent callers share one refresh instead of racing.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        path: Optional[Path] = DEFAULT_CACHE_PATH,
+        refresh_margin: float = 60,
+        grant_type: str = "refresh_token",
+        refresh_token: str = "dummy",
+        tenant: Optional[str] = None,
+    ):
+        self.key = base_url.rstrip("/") + (f"#{tenant}" if tenant else "")
+        self.tenant = tenant
+        self.path = Path(path) if path else None
+        self.refresh_margin = refresh_margin
+        self.grant_type = grant_type
+        self.refresh_token = refresh_token
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+
+    def _read_disk(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            entry = json.loads(self.path.read_text()).get(self.key)
+        except (OSError, ValueError):
+            return
+        if entry:
+            self._token = entry["access_token"]
+            self._expires_at = entry["expires_at"]
+
+    def _write_disk(self):
+        if not self.path:
+            return
+        try:
+            entries = json.loads(self.path.read_text()) if self.path.exists() else {}
+        except (OSError, ValueError):
+            entries = {}
+        if self._token:
+            entries[self.key] = {"access_token": self._token, "expires_at": self._expires_at}
+        else:
+            entries.pop(self.key, None)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(entries))
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def cached(self) -> Optional[str]:
+        """The cached token, if it stays valid for longer than the refresh margin."""
+        if self._token is None:
+            self._read_disk()
+        if self._token and self._expires_at - time.time() > self.refresh_margin:
+            return self._token
+        return None
+
+    def store(self, token: str, expires_in: Optional[int]):
+        self._token = token
+        self._expires_at = time.time() + (expires_in or DEFAULT_EXPIRES_IN)
+        self._write_disk()
+
+    def invalidate(self, token: Optional[str] = None):
+        """Forget the cached token (only if it is still ``token``, when given)."""
+        if token is None or token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+            self._write_disk()
+
+    def _request(self) -> dict:
+        return {
+            "url": "/oauth2/access_token",
+            "data": {"grant_type": self.grant_type, "refresh_token": self.refresh_token},
+            "headers": {"X-Tenant-ID": self.tenant} if self.tenant else None,
+        }
+
+    def _store_response(self, response: httpx.Response) -> str:
+        if response.status_code != 200:
+            raise TokenError(f"Token request failed with HTTP {response.status_code}", response)
+        try:
+            data = response.json()
+            self.store(data["access_token"], data.get("expires_in"))
+        except (ValueError, KeyError):
+            raise TokenError("Invalid token response format", response)
+        return self._token
+
+    def get(self, http: httpx.Client, force: bool = False) -> str:
+        with self._lock:
+            token = None if force else self.cached()
+            if token is None:
+                token = self._store_response(http.post(**self._request()))
+            return token
+
+    async def aget(self, http: httpx.AsyncClient, force: bool = False) -> str:
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            token = None if force else self.cached()
+            if token is None:
+                token = self._store_response(await http.post(**self._request()))
+            return token
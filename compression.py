@@ -0,0 +1,140 @@
+import logging
+import os
+import zlib
+from typing import Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger("fake_carecloud.compression")
+
+# Encodings the server may use, in order of preference; "off" (or empty) disables compression
+COMPRESSION = os.getenv("FAKE_CARECLOUD_COMPRESSION", "br,gzip").lower()
+
+# Responses smaller than this many bytes are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv("FAKE_CARECLOUD_COMPRESSION_MIN_SIZE", "1000"))
+
+# Fast settings: the point is to keep load tests from being network bound, not to save every byte
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "application/vnd.apache.arrow",
+)
+
+
+def available_encodings(setting: str = COMPRESSION) -> Tuple[str, ...]:
+    encodings = []
+    for encoding in (name.strip() for name in setting.split(",")):
+        if encoding in ("", "off", "none"):
+            continue
+        if encoding == "br" and brotli is None:
+            # Brotli is optional; fall back to gzip quietly unless it was the only choice
+            if setting.strip() == "br":
+                logger.warning("FAKE_CARECLOUD_COMPRESSION=br needs the brotli package (pip install brotli)")
+            continue
+        if encoding not in ("br", "gzip"):
+            logger.warning(f"Ignoring unknown encoding {encoding!r} in FAKE_CARECLOUD_COMPRESSION")
+            continue
+        encodings.append(encoding)
+    return tuple(encodings)
+
+
+def choose_encoding(accept_encoding: str, encodings: Tuple[str, ...]) -> Optional[str]:
+    """The first of ``encodings`` the client accepts (``q=0`` means refused)."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:].strip("0.") == "":
+            continue
+        accepted.add(name.strip())
+    for encoding in encodings:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.flush = compressor.compress, compressor.flush
+
+
+def is_compressible(headers: Headers) -> bool:
+    return "content-encoding" not in headers and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Compresses responses with Brotli or gzip when the client accepts them.
+
+    Small responses, already encoded ones (like gzipped exports) and binary
+    content types are passed through. Streaming responses are compressed as
+    they stream.
+    """
+
+    def __init__(self, app, encodings: Tuple[str, ...] = None, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.encodings = available_encodings() if encodings is None else encodings
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def compressing_send(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether compression pays off
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if is_compressible(headers) and (more_body or len(body) >= self.minimum_size):
+                    compressor = Compressor(encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                    if not more_body:
+                        body = compressor.compress(body) + compressor.flush()
+                        headers["Content-Length"] = str(len(body))
+                        await send(start)
+                        start = None
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                await send(start)
+                start = None
+
+            if compressor is None:
+                await send(message)
+                return
+            body = compressor.compress(body)
+            if not more_body:
+                body += compressor.flush()
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
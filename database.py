@@ -1,22 +1,441 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import create_engine, event, make_url, Column, String, Integer, DateTime, Boolean, Text, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import StaticPool
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
 import uuid
 import os
 
+logger = logging.getLogger("fake_carecloud.database")
+
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./carecloud.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Optional replica for read-only endpoints. Unset means "derive one": a second
+# read-only connection pool on the same SQLite file.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+
+# Per-tenant databases, e.g. "sqlite:///./tenants/{tenant}.db". Unset disables tenancy.
+TENANT_DATABASE_URL = os.getenv("FAKE_CARECLOUD_TENANT_DATABASE_URL")
+
+# Create a tenant's database on its first request. Off by default, since any
+# client could otherwise create database files; tenants are then created with
+# POST /debug/tenants/{tenant} or import_data.py --tenant.
+CREATE_TENANTS = os.getenv("FAKE_CARECLOUD_CREATE_TENANTS", "false").lower() == "true"
+
+# At most this many tenant databases keep engines (and connections) open
+MAX_OPEN_TENANTS = int(os.getenv("FAKE_CARECLOUD_MAX_OPEN_TENANTS", "64"))
+
+# Tenant engines unused for this many seconds are closed
+TENANT_IDLE_SECONDS = int(os.getenv("FAKE_CARECLOUD_TENANT_IDLE_SECONDS", "300"))
+
+# Ephemeral in-memory databases selected with X-Isolation-ID (for parallel test runs)
+ISOLATION_ENABLED = os.getenv("FAKE_CARECLOUD_ISOLATION", "false").lower() == "true"
+
+# Database that isolated databases start as a copy of; unset means a freshly seeded one
+ISOLATION_TEMPLATE_URL = os.getenv("FAKE_CARECLOUD_ISOLATION_TEMPLATE")
+
+# At most this many isolated databases are kept; beyond that the least recently used is discarded
+MAX_ISOLATED_DATABASES = int(os.getenv("FAKE_CARECLOUD_MAX_ISOLATED_DATABASES", "256"))
+
+# Isolated databases unused for this many seconds are discarded
+ISOLATED_IDLE_SECONDS = int(os.getenv("FAKE_CARECLOUD_ISOLATED_IDLE_SECONDS", "600"))
+
+# Tenant names of isolated databases start with this (tenant IDs themselves can't contain it)
+ISOLATED_PREFIX = "~"
+
+
+def is_in_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def read_only_url(url: str):
+    """The mode=ro variant of a SQLite file URL, or None if it has no file."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    if parsed.database.startswith("file:"):
+        return None
+    return parsed.set(
+        database=f"file:{parsed.database}",
+        query={**parsed.query, "mode": "ro", "uri": "true"}
+    )
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    # WAL lets the read-only connections read while a write is in progress
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+def create_engines(url: str, read_url=None, creator=None):
+    """Return (primary, read-only) engines. They are the same engine when no read path applies."""
+    options = {"connect_args": {"check_same_thread": False}}
+    if is_in_memory(url):
+        # Every new connection to :memory: is a new, empty database, so share one
+        options["poolclass"] = StaticPool
+    if creator is not None:
+        options["creator"] = creator
+    primary = create_engine(url, **options)
+    read_url = read_url or read_only_url(url)
+    if read_url is None:
+        return primary, primary
+    if make_url(read_url).query.get("mode") == "ro":
+        event.listen(primary, "connect", _enable_wal)
+    return primary, create_engine(read_url, connect_args={"check_same_thread": False})
+
+
+class Database:
+    """One database: its primary and read-only engines and their session factories."""
+
+    def __init__(self, url: str, read_url=None, tenant: Optional[str] = None, creator=None):
+        self.url = url
+        self.tenant = tenant
+        self.engine, self.read_engine = create_engines(url, read_url, creator)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine)
+
+    def dispose(self):
+        self.engine.dispose()
+        if self.read_engine is not self.engine:
+            self.read_engine.dispose()
+
+
+default_database = Database(SQLALCHEMY_DATABASE_URL, SQLALCHEMY_READ_DATABASE_URL)
+engine, read_engine = default_database.engine, default_database.read_engine
+SessionLocal, ReadSessionLocal = default_database.SessionLocal, default_database.ReadSessionLocal
 
 Base = declarative_base()
 
+
+class TenantDatabases:
+    """Tenant databases opened on demand from a URL template.
+
+    Only recently used tenants keep engines: beyond ``max_open`` the least
+    recently used one is closed, as is any tenant idle for ``idle_seconds``.
+    Closed tenants reopen transparently (their data stays on disk).
+    """
+
+    def __init__(self, url_template: Optional[str], max_open: int, idle_seconds: float, create: bool = True):
+        self.url_template = url_template
+        # Whether requests may create tenants that don't exist yet (see exists)
+        self.create = create
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._open: "OrderedDict[str, Database]" = OrderedDict()
+        self._last_used = {}
+        self._opening = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url_template)
+
+    def url_for(self, tenant: str) -> str:
+        url = self.url_template.format(tenant=tenant)
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+            directory = os.path.dirname(parsed.database)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        return url
+
+    def exists(self, tenant: str) -> bool:
+        """Whether the tenant's database is open or on disk. Databases that aren't files always exist."""
+        with self._lock:
+            if tenant in self._open:
+                return True
+        parsed = make_url(self.url_template.format(tenant=tenant))
+        if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+            return True
+        return os.path.exists(parsed.database)
+
+    def get(self, tenant: str) -> Database:
+        now = time.monotonic()
+        with self._lock:
+            database = self._open.get(tenant)
+            if database is not None:
+                self._open.move_to_end(tenant)
+                self._last_used[tenant] = now
+                return database
+            opening = self._opening.setdefault(tenant, threading.Lock())
+
+        # Opening (and on first use, bootstrapping) happens outside the registry
+        # lock so other tenants are not held up
+        with opening:
+            with self._lock:
+                database = self._open.get(tenant)
+            if database is None:
+                database = self._open_database(tenant)
+
+        with self._lock:
+            self._opening.pop(tenant, None)
+            self._open[tenant] = database
+            self._open.move_to_end(tenant)
+            self._last_used[tenant] = now
+            evicted = []
+            while len(self._open) > self.max_open:
+                lru = self._pop_lru()
+                if lru is None:
+                    break
+                evicted.append(lru)
+            if now - self._last_sweep > self.idle_seconds / 4:
+                evicted += self._pop_idle(now)
+                self._last_sweep = now
+        for closed in evicted:
+            closed.dispose()
+        return database
+
+    def _open_database(self, tenant: str) -> Database:
+        from bootstrap import bootstrap_database, is_bootstrapped
+
+        database = Database(self.url_for(tenant), tenant=tenant)
+        # Checked on the database itself, so nothing is kept for closed tenants
+        if not is_bootstrapped(database):
+            bootstrap_database(database)
+        logger.info(f"Opened database for tenant {tenant}")
+        return database
+
+    def _in_use(self, database: Database) -> bool:
+        """Whether closing the database now would break a running request."""
+        return False
+
+    def _pop_lru(self) -> Optional[Database]:
+        for tenant, database in self._open.items():
+            if not self._in_use(database):
+                break
+        else:
+            return None
+        del self._open[tenant]
+        self._last_used.pop(tenant, None)
+        logger.info(f"Closed database for tenant {tenant} (least recently used)")
+        return database
+
+    def _pop_idle(self, now: float) -> List[Database]:
+        idle = [
+            tenant for tenant, used in self._last_used.items()
+            if now - used > self.idle_seconds and not self._in_use(self._open[tenant])
+        ]
+        for tenant in idle:
+            del self._last_used[tenant]
+            logger.info(f"Closed database for tenant {tenant} (idle)")
+        return [self._open.pop(tenant) for tenant in idle]
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Close tenants that have been idle too long. Returns how many were closed."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            evicted = self._pop_idle(now)
+            self._last_sweep = now
+        for closed in evicted:
+            closed.dispose()
+        return len(evicted)
+
+    def close(self, tenant: str) -> bool:
+        """Close one tenant's engines now. Returns False if it wasn't open."""
+        with self._lock:
+            database = self._open.pop(tenant, None)
+            self._last_used.pop(tenant, None)
+        if database is None:
+            return False
+        database.dispose()
+        logger.info(f"Closed database for tenant {tenant}")
+        return True
+
+    def open_databases(self) -> List[Database]:
+        with self._lock:
+            return list(self._open.values())
+
+    def close_all(self):
+        with self._lock:
+            evicted = list(self._open.values())
+            self._open.clear()
+            self._last_used.clear()
+        for closed in evicted:
+            closed.dispose()
+
+
+tenant_databases = TenantDatabases(TENANT_DATABASE_URL, MAX_OPEN_TENANTS, TENANT_IDLE_SECONDS, CREATE_TENANTS)
+
+
+def is_isolated(tenant: Optional[str]) -> bool:
+    return tenant is not None and tenant.startswith(ISOLATED_PREFIX)
+
+
+class IsolatedDatabase(Database):
+    """An in-memory copy of the isolation template.
+
+    All its sessions share one SQLite connection, so requests to the same
+    isolated database take turns through ``request_lock`` (see
+    ``IsolatedDatabases.use``).
+    """
+
+    def __init__(self, tenant: str, creator):
+        super().__init__("sqlite://", tenant=tenant, creator=creator)
+        self.request_lock = asyncio.Lock()
+        # Set when discarded while a request held it; that request closes it
+        self.discarded = False
+
+
+class IsolatedDatabases(TenantDatabases):
+    """Ephemeral databases, one per isolation ID, for test runs that must not share data.
+
+    Each starts as a copy of a template that is bootstrapped once (seeded, or
+    loaded from ``template_url``) and kept in memory. Copying it with SQLite's
+    backup API takes well under a millisecond for the seeded template and
+    grows with the template's size. Discarded databases (closed, least
+    recently used or idle) lose their data; the next request with the same ID
+    gets a fresh copy.
+    """
+
+    def __init__(self, enabled: bool, template_url: Optional[str], max_open: int, idle_seconds: float):
+        super().__init__(None, max_open, idle_seconds)
+        self._enabled = enabled
+        self.template_url = template_url
+        self._template: Optional[Database] = None
+        self._template_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def _build_template(self) -> Database:
+        from bootstrap import bootstrap_database
+        from migrations import wait_for_index_builds
+
+        name = f"{ISOLATED_PREFIX}template"
+        template = Database("sqlite://", tenant=name)
+        if self.template_url:
+            source = Database(self.template_url, tenant=name)
+            bootstrap_database(source)
+            wait_for_index_builds(source)
+            _copy_database(source.engine, template.engine)
+            source.dispose()
+        else:
+            bootstrap_database(template)
+        return template
+
+    def _clone(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(":memory:", check_same_thread=False)
+        with self._template_lock:
+            if self._template is None:
+                self._template = self._build_template()
+            _copy_database(self._template.engine, connection)
+        return connection
+
+    def _open_database(self, tenant: str) -> Database:
+        # The copy is made when the database is first used
+        return IsolatedDatabase(tenant, creator=self._clone)
+
+    def _in_use(self, database: Database) -> bool:
+        # Disposing the engine would close the connection under the request
+        return database.request_lock.locked()
+
+    @asynccontextmanager
+    async def use(self, tenant: str):
+        """Hold an isolated database for one request, so it isn't discarded while the request runs."""
+        while True:
+            database = self.get(tenant)
+            await database.request_lock.acquire()
+            with self._lock:
+                current = self._open.get(tenant) is database
+            if current:
+                break
+            # Discarded while waiting for the lock; get() opens a fresh copy
+            database.request_lock.release()
+        # get_database() keeps returning it to this request, even once discarded
+        token = held_isolated_database.set(database)
+        try:
+            yield database
+        finally:
+            held_isolated_database.reset(token)
+            database.request_lock.release()
+            if database.discarded:
+                database.dispose()
+
+    def discard(self, tenant: str) -> bool:
+        """Discard an isolated database. Returns False if it wasn't open.
+
+        Requests with its ID get a fresh copy from now on. A request still
+        using it (FastAPI closes a request's session after sending the
+        response, and the discarding request may carry the ID itself) closes
+        it when done, so this never waits.
+        """
+        with self._lock:
+            database = self._open.pop(tenant, None)
+            self._last_used.pop(tenant, None)
+        if database is None:
+            return False
+        if database.request_lock.locked():
+            database.discarded = True
+        else:
+            database.dispose()
+        logger.info(f"Discarded isolated database {tenant.removeprefix(ISOLATED_PREFIX)}")
+        return True
+
+    def close_all(self):
+        super().close_all()
+        with self._template_lock:
+            if self._template is not None:
+                self._template.dispose()
+                self._template = None
+
+
+def _copy_database(source_engine, target):
+    """Copy a SQLite database into ``target`` (a sqlite3 connection or an engine) with the backup API."""
+    source = source_engine.raw_connection()
+    target_connection = None if isinstance(target, sqlite3.Connection) else target.raw_connection()
+    try:
+        source.driver_connection.backup(target if target_connection is None else target_connection.driver_connection)
+    finally:
+        source.close()
+        if target_connection is not None:
+            target_connection.close()
+
+
+isolated_databases = IsolatedDatabases(
+    ISOLATION_ENABLED, ISOLATION_TEMPLATE_URL, MAX_ISOLATED_DATABASES, ISOLATED_IDLE_SECONDS
+)
+
+# Set per request by tenancy.TenantMiddleware; None is the default database
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+# The isolated database the current request holds (see IsolatedDatabases.use)
+held_isolated_database: ContextVar[Optional["IsolatedDatabase"]] = ContextVar("held_isolated_database", default=None)
+
+
+def get_database() -> Database:
+    """The database of the tenant (or isolation ID) the current request belongs to."""
+    tenant = current_tenant.get()
+    if tenant is None:
+        return default_database
+    if is_isolated(tenant):
+        return held_isolated_database.get() or isolated_databases.get(tenant)
+    return tenant_databases.get(tenant)
+
+
 def get_db():
-    db = SessionLocal()
+    db = get_database().SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    """Session for endpoints that never write. Served by the read-only engine."""
+    db = get_database().ReadSessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
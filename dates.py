@@ -0,0 +1,43 @@
+from datetime import date, datetime, timezone
+from functools import lru_cache
+
+# Date of birth formats accepted from clients, tried in order
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y%m%d", "%m-%d-%Y", "%Y/%m/%d")
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value: str) -> date:
+    """Parse a date of birth in any accepted format. Raises ValueError."""
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    # Full timestamps are accepted too; only the date part is kept
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Convert a datetime with an offset to naive UTC; naive ones are UTC already."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_local_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, keeping the UTC offset the client sent (if any). Raises ValueError."""
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+
+
+@lru_cache(maxsize=65536)
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp into a naive UTC datetime. Raises ValueError.
+
+    Timestamps without an offset are taken to be UTC already.
+    """
+    return to_naive_utc(parse_local_datetime(value))
@@ -0,0 +1,176 @@
+"""Streaming exports of patients and appointments.
+
+Rows come from one joined query read in chunks (``yield_per``), and each chunk
+is encoded and optionally gzipped before the next is fetched, so memory use
+doesn't depend on the table size.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterator, Optional
+from sqlalchemy import false, select, true, union_all
+from database import Database
+from models import Appointment, ArchivedAppointment, Patient, Provider, Location, VisitReason
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+# Rows fetched from the database and encoded per chunk
+CHUNK_SIZE = 5000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+PATIENT_FIELDS = ("id", "first_name", "last_name", "date_of_birth", "created_at")
+
+APPOINTMENT_FIELDS = (
+    "id", "start_time", "end_time", "status", "patient_id",
+    "provider_id", "provider_name", "location_id", "location_name",
+    "visit_reason_id", "visit_reason_name", "resource_id", "series_id", "archived",
+)
+
+# Column types (for Arrow, and to know which columns need formatting); anything not listed is a string
+COLUMN_TYPES = {
+    "date_of_birth": "date32",
+    "created_at": "timestamp",
+    "start_time": "timestamp",
+    "end_time": "timestamp",
+    "provider_id": "int64",
+    "location_id": "int64",
+    "visit_reason_id": "int64",
+    "resource_id": "int64",
+    "archived": "bool",
+}
+
+
+def patients_query():
+    return select(*(getattr(Patient, name) for name in PATIENT_FIELDS)).order_by(Patient.created_at, Patient.id)
+
+
+def _appointments_select(table, archived: bool):
+    # Reference names come from the join, not from a lookup per row
+    return (
+        select(
+            table.id, table.start_time, table.end_time, table.status, table.patient_id,
+            table.provider_id, Provider.name.label("provider_name"),
+            table.location_id, Location.name.label("location_name"),
+            table.visit_reason_id, VisitReason.name.label("visit_reason_name"),
+            table.resource_id, table.series_id, (true() if archived else false()).label("archived"),
+        )
+        .outerjoin(Provider, Provider.id == table.provider_id)
+        .outerjoin(Location, Location.id == table.location_id)
+        .outerjoin(VisitReason, VisitReason.id == table.visit_reason_id)
+    )
+
+
+def appointments_query(include_archived: bool = False):
+    query = _appointments_select(Appointment, archived=False)
+    if include_archived:
+        query = union_all(query, _appointments_select(ArchivedAppointment, archived=True))
+    return query
+
+
+def as_text(fields, rows: list) -> list:
+    """Rows with dates and times in ISO format, as in the API responses."""
+    temporal = [index for index, name in enumerate(fields) if COLUMN_TYPES.get(name) in ("date32", "timestamp")]
+    converted = []
+    for row in rows:
+        row = list(row)
+        for index in temporal:
+            if row[index] is not None:
+                row[index] = row[index].isoformat()
+        converted.append(row)
+    return converted
+
+
+def encode_csv(fields, chunks: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows(as_text(fields, rows))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(fields, chunks: Iterator[list]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(fields, row)), separators=(",", ":")) + "\n"
+            for row in as_text(fields, rows)
+        ).encode()
+
+
+def arrow_schema(fields):
+    types = {
+        "date32": pyarrow.date32(),
+        "timestamp": pyarrow.timestamp("us"),
+        "int64": pyarrow.int64(),
+        "bool": pyarrow.bool_(),
+    }
+    return pyarrow.schema([(name, types.get(COLUMN_TYPES.get(name), pyarrow.string())) for name in fields])
+
+
+def encode_arrow(fields, chunks: Iterator[list]) -> Iterator[bytes]:
+    """Arrow IPC stream with one record batch per chunk."""
+    schema = arrow_schema(fields)
+    sink = io.BytesIO()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        columns = list(zip(*rows)) if rows else [()] * len(fields)
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "arrow": encode_arrow}
+
+
+def gzipped(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_rows(database: Database, query, fields, fmt: str, gzip: bool = False, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Encoded export of ``query``. Opens its own session, since it outlives the request handler."""
+
+    def chunks():
+        db = database.ReadSessionLocal()
+        try:
+            result = db.execute(query.execution_options(yield_per=chunk_size))
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            db.close()
+
+    encoded = ENCODERS[fmt](fields, chunks())
+    return gzipped(encoded) if gzip else encoded
+
+
+def format_available(fmt: str) -> Optional[str]:
+    """An error message when ``fmt`` can't be produced here, otherwise None."""
+    if fmt not in FORMATS:
+        return f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}"
+    if fmt == "arrow" and pyarrow is None:
+        return "The arrow format needs pyarrow (pip install pyarrow)"
+    return None
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from fnmatch import fnmatchcase
+from typing import Optional
+from fastapi.responses import JSONResponse
+from schemas import FaultConfig, FaultRule
+
+logger = logging.getLogger("fake_carecloud.faults")
+
+# The control endpoints must stay reachable whatever the rules say
+EXEMPT_PREFIXES = ("/debug", "/health", "/docs", "/openapi.json")
+
+
+class Fault:
+    def __init__(self, delay: float = 0.0, status: Optional[int] = None, retry_after: Optional[int] = None):
+        self.delay = delay
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FaultInjector:
+    """Decides, per request, how much latency and which error to inject."""
+
+    def __init__(self):
+        self.configure(FaultConfig(enabled=False))
+
+    def configure(self, config: FaultConfig):
+        self.config = config
+        # Each rule gets its own generator so rules don't perturb each other's sequence
+        self._rngs = [random.Random(None if config.seed is None else config.seed + index) for index in range(len(config.rules))]
+        self._windows = [(0, 0) for _ in config.rules]
+        self._methods = [{method.upper() for method in rule.methods} for rule in config.rules]
+        self.injected = {"delayed": 0, "errors": 0, "rate_limited": 0}
+        logger.info(f"Fault injection {'enabled' if self.active else 'disabled'} with {len(config.rules)} rule(s)")
+
+    @property
+    def active(self) -> bool:
+        return self.config.enabled and bool(self.config.rules)
+
+    def _match(self, method: str, path: str) -> Optional[int]:
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        for index, rule in enumerate(self.config.rules):
+            if self._methods[index] and method not in self._methods[index]:
+                continue
+            if fnmatchcase(path, rule.route):
+                return index
+        return None
+
+    @staticmethod
+    def _latency(rule: FaultRule, rng: random.Random) -> float:
+        latency = rule.latency
+        if latency is None:
+            return 0.0
+        if latency.distribution == "normal":
+            ms = rng.gauss(latency.ms, latency.stddev_ms)
+        elif latency.distribution == "long_tail":
+            # Log-normal with the configured median; tail_sigma controls how heavy the tail is
+            ms = rng.lognormvariate(math.log(latency.ms), latency.tail_sigma) if latency.ms > 0 else 0.0
+        else:
+            ms = latency.ms
+        if latency.max_ms is not None:
+            ms = min(ms, latency.max_ms)
+        return max(ms, 0.0) / 1000
+
+    def _rate_limited(self, index: int, rule: FaultRule) -> Optional[int]:
+        if rule.rate_limit_per_second is None:
+            return None
+        now = time.monotonic()
+        second = int(now)
+        window, count = self._windows[index]
+        if window != second:
+            window, count = second, 0
+        count += 1
+        self._windows[index] = (window, count)
+        if count <= rule.rate_limit_per_second:
+            return None
+        if rule.retry_after is not None:
+            return rule.retry_after
+        return max(1, math.ceil(window + 1 - now))
+
+    def decide(self, method: str, path: str) -> Optional[Fault]:
+        index = self._match(method, path)
+        if index is None:
+            return None
+
+        rule = self.config.rules[index]
+        rng = self._rngs[index]
+        fault = Fault(delay=self._latency(rule, rng))
+        if fault.delay:
+            self.injected["delayed"] += 1
+
+        retry_after = self._rate_limited(index, rule)
+        if retry_after is not None:
+            fault.status = 429
+            fault.retry_after = retry_after
+            self.injected["rate_limited"] += 1
+        elif rule.error_rate and rule.error_statuses and rng.random() < rule.error_rate:
+            fault.status = rng.choice(rule.error_statuses)
+            self.injected["errors"] += 1
+
+        return fault
+
+
+injector = FaultInjector()
+
+
+class FaultInjectionMiddleware:
+    """ASGI middleware that applies the injector's decision before the route runs."""
+
+    def __init__(self, app, injector: FaultInjector = injector):
+        self.app = app
+        self.injector = injector
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.injector.active:
+            await self.app(scope, receive, send)
+            return
+
+        fault = self.injector.decide(scope["method"], scope["path"])
+        if fault is None:
+            await self.app(scope, receive, send)
+            return
+
+        if fault.delay:
+            await asyncio.sleep(fault.delay)
+
+        if fault.status is None:
+            await self.app(scope, receive, send)
+            return
+
+        if fault.status == 429:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(fault.retry_after)}
+            )
+        else:
+            response = JSONResponse(
+                status_code=fault.status,
+                content={"detail": "Injected fault"}
+            )
+        await response(scope, receive, send)
+
+
+def load_from_env():
+    """Apply a fault configuration from FAKE_CARECLOUD_FAULTS (JSON), if set."""
+    raw = os.getenv("FAKE_CARECLOUD_FAULTS")
+    if raw:
+        injector.configure(FaultConfig(**json.loads(raw)))
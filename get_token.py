@@ -4,43 +4,33 @@ Command line tool to get an access token from the fake CareCloud API.
 """
 
 import click
-import requests
+import httpx
 import json
 import sys
 import os
+from carecloud_client import DEFAULT_CACHE_PATH, TokenError, get_access_token as get_cached_access_token
 
-def get_access_token(base_url, grant_type, refresh_token):
-    """Get an access token from the fake CareCloud API."""
-    
-    url = f"{base_url}/oauth2/access_token"
-    
-    data = {
-        "grant_type": grant_type,
-        "refresh_token": refresh_token
-    }
-    
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
+def get_access_token(base_url, grant_type, refresh_token, force=False, use_cache=True, tenant=None):
+    """Get an access token from the fake CareCloud API (cached until near expiry)."""
     
     try:
-        response = requests.post(url, data=data, headers=headers)
-        response.raise_for_status()
+        return get_cached_access_token(
+            base_url,
+            grant_type=grant_type,
+            refresh_token=refresh_token,
+            force=force,
+            token_cache_path=DEFAULT_CACHE_PATH if use_cache else None,
+            tenant=tenant
+        )
         
-        token_data = response.json()
-        return token_data["access_token"]
-        
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         click.echo(f"Error: Could not connect to {base_url}", err=True)
         click.echo("Make sure the fake CareCloud API server is running.", err=True)
         sys.exit(1)
-    except requests.exceptions.HTTPError as e:
-        click.echo(f"Error: HTTP {response.status_code}", err=True)
-        click.echo(f"Response: {response.text}", err=True)
-        sys.exit(1)
-    except KeyError:
-        click.echo("Error: Invalid response format", err=True)
-        click.echo(f"Response: {response.text}", err=True)
+    except TokenError as e:
+        click.echo(f"Error: {e}", err=True)
+        if e.response is not None:
+            click.echo(f"Response: {e.response.text}", err=True)
         sys.exit(1)
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -62,6 +52,21 @@ def get_access_token(base_url, grant_type, refresh_token):
     default="dummy",
     help="Refresh token"
 )
+@click.option(
+    "--tenant",
+    default=lambda: os.getenv("FAKE_CARECLOUD_TENANT"),
+    help="Tenant to get a token for (sent as X-Tenant-ID)"
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Request a new token even if the cached one is still valid"
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Don't read or write the on-disk token cache"
+)
 @click.option(
     "--export",
     is_flag=True,
@@ -78,9 +83,12 @@ def get_access_token(base_url, grant_type, refresh_token):
     is_flag=True,
     help="Only output the token"
 )
-def main(url, grant_type, refresh_token, export, output_json, quiet):
+def main(url, grant_type, refresh_token, tenant, refresh, no_cache, export, output_json, quiet):
     """Get an access token from the fake CareCloud API.
     
+    Tokens are cached on disk and reused until they are about to expire, since
+    requesting a new token revokes the previous one.
+    
     Examples:
     
       get_token.py                           # Get token from localhost:7000
@@ -90,10 +98,14 @@ def main(url, grant_type, refresh_token, export, output_json, quiet):
       get_token.py --export                  # Export as environment variable
       
       get_token.py --json                    # Output as JSON
+      
+      get_token.py --refresh                 # Force a new token
+      
+      get_token.py --tenant practice-a       # Token for one tenant
     """
     
     # Get the token
-    token = get_access_token(url, grant_type, refresh_token)
+    token = get_access_token(url, grant_type, refresh_token, force=refresh, use_cache=not no_cache, tenant=tenant)
     
     # Output in requested format
     if output_json:
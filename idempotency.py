@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from auth import is_valid_token
+from database import current_tenant, get_database
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+
+# Seconds a response is kept for replay; 0 turns idempotency keys off
+IDEMPOTENCY_TTL = int(os.getenv("FAKE_CARECLOUD_IDEMPOTENCY_TTL", "3600"))
+
+# Stored responses beyond this are evicted oldest first
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("FAKE_CARECLOUD_IDEMPOTENCY_MAX_KEYS", "10000"))
+
+# Only API writes are idempotent; token requests and debug endpoints are not
+IDEMPOTENT_PREFIXES = ("/v2/",)
+
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, status: int, headers: list, body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """Responses by idempotency key, evicted after ``ttl`` seconds or when over ``max_keys``.
+
+    Only used from the event loop, so no locking is needed. ``pending`` holds the
+    requests currently executing, which concurrent duplicates wait for.
+    """
+
+    def __init__(self, ttl: float, max_keys: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.responses: "OrderedDict[Tuple, StoredResponse]" = OrderedDict()
+        self.pending = {}
+
+    def get(self, key: Tuple, now: float) -> Optional[StoredResponse]:
+        stored = self.responses.get(key)
+        if stored is not None and stored.expires_at <= now:
+            del self.responses[key]
+            return None
+        return stored
+
+    def put(self, key: Tuple, stored: StoredResponse, now: float):
+        self.responses[key] = stored
+        self.responses.move_to_end(key)
+        # Entries are in insertion order and share one TTL, so expired ones are at the front
+        while self.responses:
+            oldest = next(iter(self.responses.values()))
+            if len(self.responses) <= self.max_keys and oldest.expires_at > now:
+                break
+            self.responses.popitem(last=False)
+
+    def clear(self):
+        self.responses.clear()
+
+
+store = IdempotencyStore(IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_KEYS)
+
+
+def is_cacheable(status: int) -> bool:
+    # Errors may not recur (a refreshed token, a fixed body, a server error), so a retry runs again
+    return 200 <= status < 300
+
+
+def bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" else None
+    return None
+
+
+def check_token(token: str) -> bool:
+    with get_database().ReadSessionLocal() as db:
+        return is_valid_token(db, token)
+
+
+async def is_authenticated(scope) -> bool:
+    token = bearer_token(scope)
+    # The thread inherits the context, so the token is checked against this tenant's database
+    return token is not None and await run_in_threadpool(check_token, token)
+
+
+async def send_json(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for a repeated ``Idempotency-Key`` instead of running the request again.
+
+    Keys are scoped to the tenant, method and path. Reusing a key with a
+    different body is rejected with 422, and a duplicate that arrives while
+    the first request is still running waits for it and gets its response.
+    Only successful responses are stored, and they are only replayed to
+    requests with a valid token; others run normally (and get their 401).
+    """
+
+    def __init__(self, app, store: IdempotencyStore = store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            self.store.ttl <= 0
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(IDEMPOTENT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = None
+        for name, value in scope["headers"]:
+            if name == IDEMPOTENCY_HEADER:
+                idempotency_key = value.decode("latin-1").strip()
+                break
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await send_json(send, 400, "Idempotency-Key is too long")
+            return
+
+        # The body is needed up front to tell a retry from a reused key
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.extend(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = (current_tenant.get(), scope["method"], scope["path"], idempotency_key)
+
+        while True:
+            stored = self.store.get(key, time.monotonic())
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    await send_json(send, 422, "Idempotency-Key was already used with a different request body")
+                    return
+                if not await is_authenticated(scope):
+                    await self.app(scope, self.buffered(bytes(body), receive), send)
+                    return
+                await self.replay(stored, send)
+                return
+            pending = self.store.pending.get(key)
+            if pending is None:
+                break
+            # Coalesce: wait for the first request, then look again. If its
+            # response wasn't stored (server error), this one runs instead.
+            await asyncio.shield(pending)
+
+        pending = self.store.pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self.execute(scope, receive, send, bytes(body), key, fingerprint)
+        finally:
+            del self.store.pending[key]
+            pending.set_result(None)
+
+    @staticmethod
+    def buffered(body: bytes, receive):
+        """A receive callable that hands the already-read body to the app."""
+        delivered = False
+
+        async def buffered_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The body has been consumed; only a disconnect can follow
+            return await receive()
+
+        return buffered_receive
+
+    async def execute(self, scope, receive, send, body: bytes, key: Tuple, fingerprint: str):
+        response = {"status": 500, "headers": []}
+        response_body = bytearray()
+
+        async def capturing_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, self.buffered(body, receive), capturing_send)
+
+        if is_cacheable(response["status"]):
+            now = time.monotonic()
+            self.store.put(
+                key,
+                StoredResponse(fingerprint, response["status"], response["headers"], bytes(response_body), now + self.store.ttl),
+                now
+            )
+
+    async def replay(self, stored: StoredResponse, send):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
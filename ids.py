@@ -0,0 +1,116 @@
+"""Identifiers for patients, appointments and appointment series.
+
+IDs are UUID strings in the API either way. ``FAKE_CARECLOUD_ID_FORMAT=uuid7``
+makes new IDs time-ordered (RFC 9562 version 7): inserts append to the end of
+the primary key B-tree instead of landing at random pages, and paging by ID
+returns records in creation order. Generation needs no coordination between
+workers; within a process a wrapping 12-bit counter keeps IDs created in
+the same millisecond (nearly always) in order.
+
+``FAKE_CARECLOUD_BINARY_IDS=true`` stores UUID keys as 16-byte BLOBs instead
+of 36-character strings, which shrinks the keys, their indexes and every
+foreign key column. IDs that aren't canonical UUIDs (imported ones, say) are
+still stored as text. Choose the storage when the database is created: a
+database keeps the storage its first patient was written with.
+"""
+
+import itertools
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Optional
+from sqlalchemy import String, text
+from sqlalchemy.types import TypeDecorator
+
+logger = logging.getLogger("fake_carecloud.ids")
+
+ID_FORMAT = os.getenv("FAKE_CARECLOUD_ID_FORMAT", "uuid4").lower()
+
+BINARY_IDS = os.getenv("FAKE_CARECLOUD_BINARY_IDS", "false").lower() == "true"
+
+if ID_FORMAT not in ("uuid4", "uuid7"):
+    logger.warning(f"Unknown FAKE_CARECLOUD_ID_FORMAT {ID_FORMAT!r}, using uuid4")
+    ID_FORMAT = "uuid4"
+
+# next() on itertools.count is atomic under the GIL, so threads need no lock
+_sequence = itertools.count(random.getrandbits(12))
+
+
+def uuid7() -> uuid.UUID:
+    """48-bit Unix time in milliseconds, a 12-bit per-process sequence, then 62 random bits."""
+    milliseconds = time.time_ns() // 1_000_000
+    sequence = next(_sequence) & 0xFFF
+    value = (
+        milliseconds << 80
+        | 0x7 << 76
+        | sequence << 64
+        | 0b10 << 62
+        | random.getrandbits(62)
+    )
+    return uuid.UUID(int=value)
+
+
+def new_id() -> str:
+    return str(uuid7() if ID_FORMAT == "uuid7" else uuid.uuid4())
+
+
+class Identifier(TypeDecorator):
+    """A UUID string key, stored as 16 bytes when FAKE_CARECLOUD_BINARY_IDS is on.
+
+    The declared column type stays VARCHAR so both storages share one schema;
+    SQLite keeps BLOB values as they are in any column.
+    """
+
+    impl = String(100)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # Only canonical (lowercase, hyphenated) UUIDs, so IDs read back exactly as written
+        if not BINARY_IDS or not isinstance(value, str) or len(value) != 36 or value != value.lower():
+            return value
+        if value[8] != "-" or value[13] != "-" or value[18] != "-" or value[23] != "-":
+            return value
+        try:
+            raw = bytes.fromhex(value[:8] + value[9:13] + value[14:18] + value[19:23] + value[24:])
+        except ValueError:
+            return value
+        # fromhex skips whitespace, so make sure all 32 digits were there
+        return raw if len(raw) == 16 else value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            # Formatting the hex directly is several times faster than str(uuid.UUID(bytes=value))
+            digits = value.hex()
+            return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+        return value
+
+
+def stored_as_binary(connection) -> Optional[bool]:
+    """Whether the database stores patient IDs as BLOBs, or None if it can't tell yet.
+
+    SQLite sorts BLOBs after text, so the largest ID (one index lookup) is a
+    BLOB whenever any is.
+    """
+    largest = connection.execute(text("SELECT max(id) FROM patients")).scalar()
+    if isinstance(largest, bytes):
+        return True
+    if isinstance(largest, str) and len(largest) == 36:
+        return False
+    # No patients, or only imported IDs that aren't UUIDs
+    return None
+
+
+def check_id_storage(connection):
+    """Fail fast when FAKE_CARECLOUD_BINARY_IDS doesn't match how the database stores IDs.
+
+    Lookups would silently miss every record otherwise.
+    """
+    binary = stored_as_binary(connection)
+    if binary is not None and binary != BINARY_IDS:
+        stored = "binary" if binary else "text"
+        raise RuntimeError(
+            f"The database stores {stored} IDs but FAKE_CARECLOUD_BINARY_IDS is {str(BINARY_IDS).lower()}; "
+            "use the setting the database was created with, or a new database"
+        )
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Command line tool to bulk import patients or appointments into the fake CareCloud database.
+"""
+
+import gzip
+import json
+import sys
+import os
+import click
+import importer
+from bootstrap import bootstrap_database
+from database import default_database, tenant_databases
+from matching import DUPLICATE_PATIENT_POLICY
+from migrations import wait_for_index_builds
+
+
+def open_input(path):
+    if path == "-":
+        return importer.text_stream(sys.stdin.buffer)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def print_progress(report):
+    rate = report.rows / report.seconds if report.seconds else 0
+    click.echo(
+        f"\r{report.rows} rows, {report.imported} imported, {report.skipped} skipped, "
+        f"{report.rejected} rejected ({rate:,.0f} rows/s)",
+        nl=False,
+        err=True
+    )
+
+
+@click.command()
+@click.argument("kind", type=click.Choice(importer.KINDS))
+@click.argument("path", type=click.Path(allow_dash=True, dir_okay=False))
+@click.option(
+    "--format", "fmt",
+    type=click.Choice(importer.FORMATS),
+    help="Input format (detected from the file extension by default)"
+)
+@click.option(
+    "--tenant",
+    default=lambda: os.getenv("FAKE_CARECLOUD_TENANT"),
+    help="Tenant database to import into (needs FAKE_CARECLOUD_TENANT_DATABASE_URL)"
+)
+@click.option(
+    "--batch-size",
+    default=importer.BATCH_SIZE,
+    show_default=True,
+    help="Rows validated and inserted together"
+)
+@click.option(
+    "--commit-every",
+    default=importer.COMMIT_EVERY,
+    show_default=True,
+    help="Rows per transaction"
+)
+@click.option(
+    "--duplicates",
+    type=click.Choice(("allow", "return", "reject")),
+    default=DUPLICATE_PATIENT_POLICY,
+    show_default=True,
+    help="What to do with patients that already exist: import them, skip them or reject them"
+)
+@click.option(
+    "--rejects",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write every rejected row's line number and error to this NDJSON file"
+)
+@click.option(
+    "--json",
+    "output_json",
+    is_flag=True,
+    help="Output the report as JSON"
+)
+def main(kind, path, fmt, tenant, batch_size, commit_every, duplicates, rejects, output_json):
+    """Import patients or appointments from a CSV or NDJSON file ('-' reads stdin).
+
+    CSV files have a header row. Patients use first_name, last_name and
+    date_of_birth, plus optional id, address (line1, city, state, zip_code, ...)
+    and phone (phone_number, phone_type_code) columns. Appointments use the
+    AppointmentCreate fields with patient_id. NDJSON lines may also be request
+    bodies as sent to POST /v2/patients or /v2/appointments.
+
+    Examples:
+
+      import_data.py patients patients.csv
+
+      import_data.py appointments appointments.ndjson.gz --rejects rejects.ndjson
+
+      zcat patients.csv.gz | import_data.py patients - --format csv
+    """
+
+    fmt = fmt or importer.detect_format(path)
+    if fmt is None:
+        click.echo("Error: Can't tell the format from the file name, pass --format", err=True)
+        sys.exit(1)
+
+    if tenant:
+        if not tenant_databases.enabled:
+            click.echo("Error: --tenant needs FAKE_CARECLOUD_TENANT_DATABASE_URL", err=True)
+            sys.exit(1)
+        database = tenant_databases.get(tenant)
+    else:
+        database = default_database
+        bootstrap_database(database)
+    # The import would otherwise queue behind index builds for the write lock
+    wait_for_index_builds(database)
+
+    rejects_file = open(rejects, "w", encoding="utf-8") if rejects else None
+
+    def write_reject(line, error):
+        rejects_file.write(json.dumps({"line": line, "error": error}) + "\n")
+
+    db = database.SessionLocal()
+    try:
+        with open_input(path) as stream:
+            report = importer.import_stream(
+                db, kind, stream, fmt,
+                batch_size=batch_size,
+                commit_every=commit_every,
+                progress=None if output_json else print_progress,
+                on_reject=write_reject if rejects_file else None,
+                duplicates=duplicates
+            )
+    except (OSError, *importer.READ_ERRORS) as e:
+        click.echo(f"\nError: {e}", err=True)
+        sys.exit(1)
+    finally:
+        db.close()
+        if rejects_file:
+            rejects_file.close()
+        tenant_databases.close_all()
+
+    if output_json:
+        click.echo(json.dumps(report.as_dict(), indent=2))
+        return
+
+    click.echo("", err=True)
+    rate = report.rows / report.seconds if report.seconds else 0
+    click.echo(f"Imported {report.imported} of {report.rows} {kind} in {report.seconds:.1f}s ({rate:,.0f} rows/s)")
+    if report.skipped:
+        click.echo(f"Skipped {report.skipped} existing patients")
+    if report.rejected:
+        click.echo(f"Rejected {report.rejected} rows:")
+        for error in report.errors[:20]:
+            click.echo(f"  line {error['line']}: {error['error']}")
+        if report.rejected > 20:
+            click.echo(f"  ... ({'see ' + rejects if rejects else 'use --rejects for the full list'})")
+
+if __name__ == "__main__":
+    main()
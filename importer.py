@@ -0,0 +1,431 @@
+"""Bulk import of patients and appointments from CSV or NDJSON.
+
+Rows are parsed as a stream, validated a batch at a time against the API
+schemas, and written with one multi-row INSERT per table per batch. Batches
+are committed together every ``commit_every`` rows, so a large file costs a
+handful of transactions instead of one per row.
+"""
+
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from dates import parse_date, parse_datetime
+from ids import new_id
+from matching import DUPLICATE_PATIENT_POLICY, patient_match_key
+from models import Appointment, Patient, PatientAddress, PatientPhone
+from schemas import AppointmentCreate, PatientRequest
+import stats
+
+KINDS = ("patients", "appointments")
+FORMATS = ("csv", "ndjson")
+
+BATCH_SIZE = 5000
+COMMIT_EVERY = 100000
+
+# Rejected rows kept in an ImportReport (all of them are still counted and passed to on_reject)
+MAX_REPORTED_ERRORS = 1000
+
+# Flat CSV columns that make up a patient's (single) address and phone
+ADDRESS_COLUMNS = ("line1", "line2", "line3", "city", "state", "zip_code", "country_name")
+PHONE_COLUMNS = ("phone_number", "phone_type_code", "extension")
+
+_patient_requests = TypeAdapter(List[PatientRequest])
+_appointments = TypeAdapter(List[AppointmentCreate])
+
+
+class ImportReport:
+    def __init__(self, kind: str, on_reject: Optional[Callable[[int, str], None]] = None):
+        self.kind = kind
+        self.on_reject = on_reject
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, error: str):
+        self.rejected += 1
+        if self.on_reject:
+            self.on_reject(line, error)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "rows": self.rows,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "seconds": round(self.seconds, 3),
+            "errors": self.errors,
+        }
+
+
+# Parsing
+
+def _blank_to_none(record: dict) -> dict:
+    return {key: value for key, value in record.items() if key and value not in ("", None)}
+
+
+def read_csv(stream: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, _blank_to_none(record)
+
+
+def read_ndjson(stream: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+def read_rows(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    return read_csv(stream) if fmt == "csv" else read_ndjson(stream)
+
+
+def _check_shape(record: dict, nested: str) -> dict:
+    if nested in record and not isinstance(record[nested], dict):
+        raise ValueError(f"{nested}: Expected an object")
+    if record.get("id") is not None and not isinstance(record["id"], str):
+        raise ValueError("id: Expected a string")
+    return record
+
+
+def patient_record(record: dict) -> dict:
+    """A PatientRequest-shaped dict (plus optional ``id``) from a flat CSV row or an NDJSON object.
+
+    Raises ValueError for shapes that can't be validated as one.
+    """
+    if "patient" in record:
+        return _check_shape(record, "patient")
+    result = {
+        "id": record.get("id"),
+        "patient": {name: record.get(name) for name in ("first_name", "last_name", "date_of_birth")},
+        "addresses": [],
+        "phones": [],
+    }
+    if record.get("line1"):
+        result["addresses"].append({name: record[name] for name in ADDRESS_COLUMNS if name in record})
+    if record.get("phone_number"):
+        result["phones"].append({name: record[name] for name in PHONE_COLUMNS if name in record})
+    return result
+
+
+def appointment_record(record: dict) -> dict:
+    """An AppointmentCreate-shaped dict (plus optional ``id``) from a flat CSV row or an NDJSON object.
+
+    Raises ValueError for shapes that can't be validated as one.
+    """
+    if "appointment" in record:
+        appointment = _check_shape(record, "appointment")["appointment"]
+        record = dict(appointment, id=record.get("id", appointment.get("id")))
+    if "patient" not in record and "patient_id" in record:
+        record = dict(record, patient={"id": record["patient_id"]})
+    return _check_shape(record, "patient")
+
+
+def shape_batch(report: ImportReport, batch: List[Tuple[int, object]], shape: Callable[[dict], dict]) -> Tuple[list, list]:
+    """(line numbers, records) of the rows ``shape`` accepts; the rest are rejected."""
+    lines, records = [], []
+    for line, record in batch:
+        if isinstance(record, Exception):
+            report.reject(line, str(record))
+            continue
+        if not isinstance(record, dict):
+            report.reject(line, "Expected an object")
+            continue
+        try:
+            records.append(shape(record))
+        except ValueError as e:
+            report.reject(line, str(e))
+            continue
+        lines.append(line)
+    return lines, records
+
+
+def _format_error(error: dict) -> str:
+    location = ".".join(str(part) for part in error["loc"][1:])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def validate_batch(adapter: TypeAdapter, records: list) -> Tuple[list, dict]:
+    """Validate a batch in one call. Returns (models, {batch index: error}); invalid entries are None."""
+    try:
+        return adapter.validate_python(records), {}
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors():
+            errors.setdefault(error["loc"][0], _format_error(error))
+        valid = adapter.validate_python([record for index, record in enumerate(records) if index not in errors])
+        models = iter(valid)
+        return [None if index in errors else next(models) for index in range(len(records))], errors
+
+
+# Writing
+
+def bulk_insert(db: Session, model, rows: List[dict]):
+    """One executemany of ``rows`` straight on the driver cursor.
+
+    The statement is compiled once and values go through the column types' own
+    bind processors, skipping the per-row parameter handling of ORM and Core
+    inserts, which costs several times the INSERT itself. Column defaults are
+    not applied, so rows must include every column that has one.
+    """
+    if not rows:
+        return
+    connection = db.connection()
+    dialect = connection.dialect
+    table = model.__table__
+    statement = insert(table).compile(dialect=dialect, column_keys=list(rows[0]))
+    names = statement.positiontup
+    for name in names:
+        process = table.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+        if process:
+            for row in rows:
+                if row[name] is not None:
+                    row[name] = process(row[name])
+    values = itemgetter(*names)
+    connection.exec_driver_sql(str(statement), [values(row) for row in rows])
+
+
+def _existing(db: Session, column, values) -> set:
+    values = [value for value in values if value]
+    return set(db.scalars(select(column).where(column.in_(values)))) if values else set()
+
+
+class PatientImporter:
+    def __init__(self, db: Session, report: ImportReport, duplicates: str = DUPLICATE_PATIENT_POLICY):
+        self.db = db
+        self.report = report
+        self.duplicates = duplicates
+        # Match keys imported so far, for duplicates within the file
+        self.seen_keys = {}
+
+    def import_batch(self, batch: List[Tuple[int, object]]):
+        lines, records = shape_batch(self.report, batch, patient_record)
+
+        requests, errors = validate_batch(_patient_requests, records)
+        ids = [record.get("id") for record in records]
+        taken_ids = _existing(self.db, Patient.id, ids)
+
+        now = datetime.utcnow()
+        patients, addresses, phones, keys = [], [], [], []
+        for index, request in enumerate(requests):
+            line = lines[index]
+            if request is None:
+                self.report.reject(line, errors[index])
+                continue
+            try:
+                date_of_birth = parse_date(request.patient.date_of_birth)
+            except ValueError:
+                self.report.reject(line, "patient.date_of_birth: Invalid date_of_birth format")
+                continue
+            patient_id = ids[index] or new_id()
+            if patient_id in taken_ids:
+                self.report.reject(line, f"id: Patient {patient_id} already exists")
+                continue
+            taken_ids.add(patient_id)
+
+            key = patient_match_key(request.patient.first_name, request.patient.last_name, date_of_birth)
+            keys.append(key)
+            patients.append({
+                "id": patient_id,
+                "first_name": request.patient.first_name,
+                "last_name": request.patient.last_name,
+                "date_of_birth": date_of_birth,
+                "match_key": key,
+                "created_at": now,
+                "updated_at": now,
+                "_line": line,
+            })
+            for address in request.addresses:
+                addresses.append(dict(address.model_dump(), patient_id=patient_id))
+            for phone in request.phones:
+                phones.append(dict(phone.model_dump(), patient_id=patient_id))
+
+        if self.duplicates != "allow" and patients:
+            patients = self._drop_duplicates(patients)
+            kept = {patient["id"] for patient in patients}
+            addresses = [address for address in addresses if address["patient_id"] in kept]
+            phones = [phone for phone in phones if phone["patient_id"] in kept]
+
+        for patient in patients:
+            del patient["_line"]
+        bulk_insert(self.db, Patient, patients)
+        bulk_insert(self.db, PatientAddress, addresses)
+        bulk_insert(self.db, PatientPhone, phones)
+
+        if patients:
+            stats.increment(self.db, {
+                (stats.TOTALS, "patients"): len(patients),
+                (stats.PATIENTS_PER_DAY, now.date().isoformat()): len(patients),
+            })
+        self.report.imported += len(patients)
+
+    def _drop_duplicates(self, patients: list) -> list:
+        existing = _existing(self.db, Patient.match_key, [patient["match_key"] for patient in patients])
+        kept = []
+        for patient in patients:
+            key = patient["match_key"]
+            if key in existing or key in self.seen_keys:
+                if self.duplicates == "return":
+                    self.report.skipped += 1
+                else:
+                    self.report.reject(patient["_line"], "Patient already exists")
+                continue
+            self.seen_keys[key] = patient["id"]
+            kept.append(patient)
+        return kept
+
+
+class AppointmentImporter:
+    def __init__(self, db: Session, report: ImportReport):
+        self.db = db
+        self.report = report
+
+    def import_batch(self, batch: List[Tuple[int, object]]):
+        lines, records = shape_batch(self.report, batch, appointment_record)
+
+        appointments, errors = validate_batch(_appointments, records)
+        ids = [record.get("id") for record in records]
+        taken_ids = _existing(self.db, Appointment.id, ids)
+        known_patients = _existing(self.db, Patient.id, {
+            appointment.patient.id for appointment in appointments if appointment is not None
+        })
+
+        now = datetime.utcnow()
+        rows = []
+        deltas = defaultdict(int)
+        for index, appointment in enumerate(appointments):
+            line = lines[index]
+            if appointment is None:
+                self.report.reject(line, errors[index])
+                continue
+            if appointment.patient.id not in known_patients:
+                self.report.reject(line, "patient.id: Patient not found")
+                continue
+            try:
+                start_time = parse_datetime(appointment.start_time)
+                end_time = parse_datetime(appointment.end_time)
+            except ValueError:
+                self.report.reject(line, "Invalid datetime format")
+                continue
+            appointment_id = ids[index] or new_id()
+            if appointment_id in taken_ids:
+                self.report.reject(line, f"id: Appointment {appointment_id} already exists")
+                continue
+            taken_ids.add(appointment_id)
+
+            rows.append({
+                "id": appointment_id,
+                "start_time": start_time,
+                "end_time": end_time,
+                "provider_id": appointment.provider_id,
+                "location_id": appointment.location_id,
+                "visit_reason_id": appointment.visit_reason_id,
+                "resource_id": appointment.resource_id,
+                "patient_id": appointment.patient.id,
+                "status": "scheduled",
+                "created_at": now,
+                "updated_at": now,
+            })
+            deltas[(stats.APPOINTMENTS_PER_DAY, start_time.date().isoformat())] += 1
+            deltas[(stats.APPOINTMENTS_PER_PROVIDER, appointment.provider_id)] += 1
+
+        if rows:
+            bulk_insert(self.db, Appointment, rows)
+            deltas[(stats.TOTALS, "appointments")] += len(rows)
+            deltas[(stats.APPOINTMENTS_PER_STATUS, "scheduled")] += len(rows)
+            stats.increment(self.db, deltas)
+        self.report.imported += len(rows)
+
+
+def import_rows(
+    db: Session,
+    kind: str,
+    rows: Iterable[Tuple[int, object]],
+    batch_size: int = BATCH_SIZE,
+    commit_every: int = COMMIT_EVERY,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+    on_reject: Optional[Callable[[int, str], None]] = None,
+    duplicates: str = DUPLICATE_PATIENT_POLICY,
+) -> ImportReport:
+    """Import ``(line number, record)`` pairs. ``progress`` is called after every batch.
+
+    ``duplicates`` applies to patients like FAKE_CARECLOUD_DUPLICATE_PATIENTS:
+    with "return" existing patients are skipped, with "reject" they are rejected.
+    """
+    report = ImportReport(kind, on_reject)
+    if kind == "patients":
+        importer = PatientImporter(db, report, duplicates)
+    else:
+        importer = AppointmentImporter(db, report)
+
+    batch = []
+    uncommitted = 0
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) < batch_size:
+                continue
+            importer.import_batch(batch)
+            report.rows += len(batch)
+            uncommitted += len(batch)
+            batch = []
+            if uncommitted >= commit_every:
+                db.commit()
+                uncommitted = 0
+            if progress:
+                progress(report)
+        if batch:
+            importer.import_batch(batch)
+            report.rows += len(batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if progress:
+        progress(report)
+    return report
+
+
+def import_stream(db: Session, kind: str, stream: Iterable[str], fmt: str, **kwargs) -> ImportReport:
+    return import_rows(db, kind, read_rows(stream, fmt), **kwargs)
+
+
+def detect_format(name: str) -> Optional[str]:
+    name = name.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+# Input that can't be read at all (rather than bad rows, which are rejected one by one)
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+
+def text_stream(binary) -> io.TextIOWrapper:
+    return io.TextIOWrapper(binary, encoding="utf-8", newline="")
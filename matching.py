@@ -0,0 +1,40 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from datetime import date
+
+logger = logging.getLogger("fake_carecloud.matching")
+
+DUPLICATE_POLICIES = ("allow", "return", "reject")
+
+# What POST /v2/patients does when the patient already exists: create another
+# one (allow), answer with the existing ID (return) or fail with 409 (reject)
+DUPLICATE_PATIENT_POLICY = os.getenv("FAKE_CARECLOUD_DUPLICATE_PATIENTS", "allow").lower()
+
+if DUPLICATE_PATIENT_POLICY not in DUPLICATE_POLICIES:
+    logger.warning(f"Ignoring FAKE_CARECLOUD_DUPLICATE_PATIENTS={DUPLICATE_PATIENT_POLICY!r}, expected one of {DUPLICATE_POLICIES}")
+    DUPLICATE_PATIENT_POLICY = "allow"
+
+# Same characters as "not str.isalnum()"
+_NOT_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """Case, accents, spaces and punctuation don't tell patients apart ("O'Brien" == "obrien")."""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+    return _NOT_ALNUM.sub("", name.casefold())
+
+
+def patient_match_key(first_name: str, last_name: str, date_of_birth: date) -> str:
+    """Hash of the normalized name and date of birth, stored indexed in patients.match_key."""
+    value = f"{normalize_name(first_name)}|{normalize_name(last_name)}|{date_of_birth.isoformat()}"
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+def match_key_default(context) -> str:
+    # Column default, so every insert path (ORM or bulk) fills the key in
+    params = context.get_current_parameters()
+    return patient_match_key(params["first_name"], params["last_name"], params["date_of_birth"])
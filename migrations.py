@@ -0,0 +1,213 @@
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import Index, text
+from database import Base
+from dates import parse_date
+from matching import patient_match_key
+
+logger = logging.getLogger("fake_carecloud.migrations")
+
+# Build missing indexes in a background thread after startup instead of before it
+ONLINE_INDEX_BUILDS = os.getenv("FAKE_CARECLOUD_ONLINE_INDEX_BUILDS", "true").lower() == "true"
+
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+# Stored in place of dates of birth that can't be parsed, so the Date column stays readable.
+# The original values are kept in UNPARSED_DATES_OF_BIRTH.
+UNKNOWN_DATE_OF_BIRTH = "1900-01-01"
+UNPARSED_DATES_OF_BIRTH = "unparsed_dates_of_birth"
+
+
+def normalize_dates_of_birth(connection):
+    rows = connection.execute(
+        text("SELECT id, date_of_birth FROM patients WHERE date_of_birth NOT GLOB :pattern"),
+        {"pattern": ISO_DATE_GLOB}
+    ).fetchall()
+
+    for patient_id, value in rows:
+        try:
+            normalized = parse_date(str(value)).isoformat()
+        except ValueError:
+            logger.warning(
+                f"Patient {patient_id} has unparseable date_of_birth {value!r}, storing {UNKNOWN_DATE_OF_BIRTH}"
+                f" and keeping the original in {UNPARSED_DATES_OF_BIRTH}"
+            )
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {UNPARSED_DATES_OF_BIRTH} "
+                "(patient_id VARCHAR(100) PRIMARY KEY, date_of_birth TEXT)"
+            ))
+            connection.execute(
+                text(f"INSERT OR REPLACE INTO {UNPARSED_DATES_OF_BIRTH} (patient_id, date_of_birth) VALUES (:id, :value)"),
+                {"id": patient_id, "value": str(value)}
+            )
+            normalized = UNKNOWN_DATE_OF_BIRTH
+        connection.execute(
+            text("UPDATE patients SET date_of_birth = :value WHERE id = :id"),
+            {"value": normalized, "id": patient_id}
+        )
+
+    if rows:
+        logger.info(f"Normalized {len(rows)} dates of birth")
+
+
+def indexes_built_online(connection):
+    # Index-only migrations: the indexes are declared on the models and
+    # created by build_missing_indexes, without holding up startup
+    pass
+
+
+def add_patient_match_keys(connection):
+    columns = {row[1] for row in connection.execute(text("PRAGMA table_info(patients)"))}
+    if "match_key" not in columns:
+        connection.execute(text("ALTER TABLE patients ADD COLUMN match_key VARCHAR(32)"))
+
+    rows = connection.execute(
+        text("SELECT id, first_name, last_name, date_of_birth FROM patients WHERE match_key IS NULL")
+    ).fetchall()
+    if rows:
+        connection.execute(
+            text("UPDATE patients SET match_key = :key WHERE id = :id"),
+            [
+                {"key": patient_match_key(first_name, last_name, date.fromisoformat(date_of_birth)), "id": patient_id}
+                for patient_id, first_name, last_name, date_of_birth in rows
+            ]
+        )
+        logger.info(f"Computed match keys for {len(rows)} patients")
+
+
+def add_appointment_series_ids(connection):
+    # The appointment_series table itself is created by create_all
+    for table in ("appointments", "archived_appointments"):
+        columns = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+        if "series_id" not in columns:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN series_id VARCHAR(100)"))
+
+
+# (version, description, function). Versions are recorded in SQLite's user_version.
+# Migrations change columns and data; new indexes only need declaring on the
+# models, and build_missing_indexes adds them to existing databases.
+MIGRATIONS = [
+    (1, "Normalize patients.date_of_birth to ISO dates", normalize_dates_of_birth),
+    (2, "Index patients.date_of_birth and appointments.start_time", indexes_built_online),
+    (3, "Add patients.match_key for duplicate detection", add_patient_match_keys),
+    (4, "Index appointments by status and start_time", indexes_built_online),
+    (5, "Add series_id to appointments for recurring series", add_appointment_series_ids),
+    (6, "Index patient_id on addresses, phones and appointments", indexes_built_online),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(engine):
+    with engine.begin() as connection:
+        version = connection.execute(text("PRAGMA user_version")).scalar()
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            logger.info(f"Applying migration {number}: {description}")
+            migrate(connection)
+            connection.execute(text(f"PRAGMA user_version = {number}"))
+
+
+def schema_version(engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+# Online index builds
+
+class IndexBuilds:
+    """Progress of the index builds for one database, shown at /debug/migrations."""
+
+    def __init__(self, pending: List[str]):
+        self.pending = pending
+        self.building: Optional[str] = None
+        self.built = []
+        self.failed = []
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and self.building is None
+
+    def as_dict(self) -> dict:
+        return {
+            "pending": list(self.pending),
+            "building": self.building,
+            "built": list(self.built),
+            "failed": list(self.failed),
+        }
+
+
+# Database tenant (None for the main database) -> its most recent builds
+index_builds = {}
+
+
+def missing_indexes(engine) -> List[Index]:
+    """Indexes declared on the models that the database doesn't have yet."""
+    with engine.connect() as connection:
+        existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    return [
+        index
+        for table in Base.metadata.sorted_tables
+        for index in sorted(table.indexes, key=lambda index: index.name)
+        if index.name not in existing
+    ]
+
+
+def build_indexes(engine, indexes: List[Index], builds: IndexBuilds):
+    """Create ``indexes`` one at a time, each in its own short transaction.
+
+    SQLite builds an index in one pass while holding the write lock, so
+    writers wait for each index (about 2 seconds per million rows) while
+    reads carry on through the WAL and the read-only connections.
+    """
+    for index in indexes:
+        builds.pending.remove(index.name)
+        builds.building = index.name
+        started = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                index.create(connection, checkfirst=True)
+        except Exception:
+            logger.exception(f"Building index {index.name} failed")
+            builds.failed.append(index.name)
+        else:
+            seconds = time.perf_counter() - started
+            builds.built.append({"name": index.name, "seconds": round(seconds, 3)})
+            logger.info(f"Built index {index.name} in {seconds:.1f}s")
+        builds.building = None
+
+
+def start_index_builds(database, background: bool = ONLINE_INDEX_BUILDS):
+    """Build the database's missing indexes, in a daemon thread when ``background``.
+
+    A build interrupted by shutdown is rolled back by SQLite and starts over
+    on the next startup.
+    """
+    indexes = missing_indexes(database.engine)
+    if not indexes:
+        return
+    builds = index_builds[database.tenant] = IndexBuilds([index.name for index in indexes])
+    logger.info(f"Building {len(indexes)} missing index(es): {', '.join(builds.pending)}")
+    if not background:
+        build_indexes(database.engine, indexes, builds)
+        return
+    builds.thread = threading.Thread(
+        target=build_indexes,
+        args=(database.engine, indexes, builds),
+        name=f"index-builds-{database.tenant or 'main'}",
+        daemon=True
+    )
+    builds.thread.start()
+
+
+def wait_for_index_builds(database):
+    """Block until the database's background index builds are done (for bulk writers like the importer)."""
+    builds = index_builds.get(database.tenant)
+    if builds is not None and builds.thread is not None:
+        builds.thread.join()
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
+from ids import Identifier, new_id
+from matching import match_key_default
 from datetime import datetime
-import uuid
 
 class Provider(Base):
     __tablename__ = "providers"
@@ -69,10 +70,12 @@ class VisitReason(Base):
 class Patient(Base):
     __tablename__ = "patients"
     
-    id = Column(String(100), primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    id = Column(Identifier, primary_key=True, index=True, default=new_id)
     first_name = Column(String(255), nullable=False)
     last_name = Column(String(255), nullable=False)
-    date_of_birth = Column(String(20), nullable=False)
+    date_of_birth = Column(Date, nullable=False, index=True)
+    # Normalized name + date of birth hash for duplicate detection (see matching.py)
+    match_key = Column(String(32), nullable=True, index=True, default=match_key_default)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
     
@@ -84,7 +87,7 @@ class PatientAddress(Base):
     __tablename__ = "patient_addresses"
     
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(String(100), ForeignKey("patients.id"))
+    patient_id = Column(Identifier, ForeignKey("patients.id"), index=True)
     line1 = Column(String(255), nullable=False)
     line2 = Column(String(255), nullable=True)
     line3 = Column(String(255), nullable=True)
@@ -100,7 +103,7 @@ class PatientPhone(Base):
     __tablename__ = "patient_phones"
     
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(String(100), ForeignKey("patients.id"))
+    patient_id = Column(Identifier, ForeignKey("patients.id"), index=True)
     phone_number = Column(String(50), nullable=False)
     phone_type_code = Column(String(10), default="M")
     extension = Column(String(20), nullable=True)
@@ -111,15 +114,17 @@ class PatientPhone(Base):
 class Appointment(Base):
     __tablename__ = "appointments"
     
-    id = Column(String(100), primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
-    start_time = Column(DateTime, nullable=False)
+    id = Column(Identifier, primary_key=True, index=True, default=new_id)
+    start_time = Column(DateTime, nullable=False, index=True)
     end_time = Column(DateTime, nullable=False)
     provider_id = Column(Integer, ForeignKey("providers.id"))
     location_id = Column(Integer, ForeignKey("locations.id"))
     visit_reason_id = Column(Integer, ForeignKey("visit_reasons.id"))
     resource_id = Column(Integer, ForeignKey("appointment_resources.id"))
-    patient_id = Column(String(100), ForeignKey("patients.id"))
+    patient_id = Column(Identifier, ForeignKey("patients.id"), index=True)
     status = Column(String(50), default="scheduled")
+    # Set for occurrences of a recurring series
+    series_id = Column(Identifier, ForeignKey("appointment_series.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
     
@@ -128,6 +133,47 @@ class Appointment(Base):
     visit_reason = relationship("VisitReason")
     resource = relationship("AppointmentResource")
     patient = relationship("Patient", back_populates="appointments")
+    
+    # Status queues (GET /v2/appointments?status=) are read in (start_time, id) order from this index
+    __table_args__ = (
+        Index("ix_appointments_status_start_time", "status", "start_time", "id"),
+    )
+
+class AppointmentSeries(Base):
+    """A recurring booking. Its occurrences are ordinary appointments with this series_id."""
+    __tablename__ = "appointment_series"
+    
+    id = Column(Identifier, primary_key=True, index=True, default=new_id)
+    recurrence = Column(String(255), nullable=False)
+    # First occurrence; later ones follow the recurrence rule with the same duration
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    provider_id = Column(Integer, ForeignKey("providers.id"))
+    location_id = Column(Integer, ForeignKey("locations.id"))
+    visit_reason_id = Column(Integer, ForeignKey("visit_reasons.id"))
+    resource_id = Column(Integer, ForeignKey("appointment_resources.id"))
+    patient_id = Column(Identifier, ForeignKey("patients.id"), index=True)
+    status = Column(String(50), default="active")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedAppointment(Base):
+    """Cancelled and past appointments moved out of the active appointments table."""
+    __tablename__ = "archived_appointments"
+    
+    id = Column(Identifier, primary_key=True)
+    start_time = Column(DateTime, nullable=False, index=True)
+    end_time = Column(DateTime, nullable=False)
+    provider_id = Column(Integer)
+    location_id = Column(Integer)
+    visit_reason_id = Column(Integer)
+    resource_id = Column(Integer)
+    patient_id = Column(Identifier, index=True)
+    status = Column(String(50))
+    series_id = Column(Identifier, index=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
 
 class AuthToken(Base):
     __tablename__ = "auth_tokens"
@@ -136,4 +182,11 @@ class AuthToken(Base):
     access_token = Column(String(255), nullable=False, unique=True)
     token_type = Column(String(50), default="Bearer")
     expires_at = Column(DateTime, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    metric = Column(String(50), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -0,0 +1,229 @@
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import sys
+import threading
+from collections import Counter
+from fnmatch import fnmatchcase
+from typing import Optional
+from schemas import ProfileConfig
+
+logger = logging.getLogger("fake_carecloud.profiling")
+
+# Profiling the profile endpoints (or the docs) would only add noise
+EXEMPT_PREFIXES = ("/debug", "/docs", "/openapi.json")
+
+
+class StackSampler:
+    """Samples the event loop thread's Python stack every ``interval`` seconds while running.
+
+    Stacks are counted, not stored, so memory grows with the number of
+    distinct stacks rather than with the number of samples.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.lock = threading.Lock()
+        self._running = threading.Event()
+        self._stopped = threading.Event()
+        self._switch_interval = sys.getswitchinterval()
+        self._thread = threading.Thread(target=self._run, name="fake-carecloud-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._running.wait()
+            if self._stopped.wait(self.interval):
+                break
+            if not self._running.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                with self.lock:
+                    self.stacks[tuple(reversed(stack))] += 1
+
+    def resume(self):
+        # Without this the sampler only gets the GIL when the loop thread
+        # releases it (I/O, sqlite), so pure Python work would barely show up
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.interval, self._switch_interval))
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+        sys.setswitchinterval(self._switch_interval)
+
+    def stop(self):
+        if self._running.is_set():
+            self.pause()
+        self._stopped.set()
+        self._running.set()
+
+    @property
+    def samples(self) -> int:
+        with self.lock:
+            return sum(self.stacks.values())
+
+    def speedscope(self, name: str) -> dict:
+        """The samples in speedscope's file format (https://www.speedscope.app)."""
+        frames, frame_index, samples, weights = [], {}, [], []
+        with self.lock:
+            stacks = list(self.stacks.items())
+        for stack, count in stacks:
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * self.interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "fake_carecloud",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class Profiler:
+    """Profiles a sample of requests and aggregates the results across them.
+
+    ``cprofile`` mode traces every call (exact counts, pstats output);
+    ``sampling`` mode takes periodic stack samples (low overhead, speedscope
+    output). Both observe the event loop thread, where the route handlers run,
+    so concurrent unprofiled requests can show up in the results too.
+    """
+
+    def __init__(self):
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._generation = 0
+        self.configure(ProfileConfig(enabled=False))
+
+    def configure(self, config: ProfileConfig):
+        # Requests still running under the old configuration stop counting; their stop() is ignored
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler:
+            self._sampler.stop()
+        self._generation += 1
+        self.config = config
+        self._methods = {method.upper() for method in config.methods}
+        self._rng = random.Random()
+        self._in_flight = 0
+        self._profile = cProfile.Profile() if config.mode == "cprofile" else None
+        self._sampler = None
+        self.profiled_requests = 0
+        logger.info(f"Profiling {'enabled' if config.enabled else 'disabled'} ({config.mode}, sample rate {config.sample_rate})")
+
+    def disable(self):
+        """Stop profiling new requests, keeping what was collected."""
+        self.config = self.config.model_copy(update={"enabled": False})
+
+    @property
+    def samples(self) -> int:
+        return self._sampler.samples if self._sampler else 0
+
+    def should_profile(self, method: str, path: str) -> bool:
+        if path.startswith(EXEMPT_PREFIXES):
+            return False
+        if self._methods and method not in self._methods:
+            return False
+        if not any(fnmatchcase(path, route) for route in self.config.routes):
+            return False
+        return self.config.sample_rate >= 1 or self._rng.random() < self.config.sample_rate
+
+    def start(self) -> int:
+        """Start profiling a request. Pass the result to ``stop`` when it is done."""
+        self._in_flight += 1
+        self.profiled_requests += 1
+        if self._in_flight > 1:
+            return self._generation
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            if self._sampler is None:
+                self._sampler = StackSampler(threading.get_ident(), self.config.interval_ms / 1000)
+            self._sampler.resume()
+        return self._generation
+
+    def stop(self, generation: int):
+        if generation != self._generation:
+            return
+        self._in_flight -= 1
+        if self._in_flight:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        elif self._sampler is not None:
+            self._sampler.pause()
+
+    def stats(self) -> Optional[pstats.Stats]:
+        if self._profile is None or not self.profiled_requests:
+            return None
+        profile_stats = pstats.Stats(self._profile)
+        # create_stats() (called by Stats) disables the profiler; keep going if requests are running
+        if self._in_flight:
+            self._profile.enable()
+        return profile_stats
+
+    def pstats_dump(self) -> Optional[bytes]:
+        """The aggregated profile in the format written by ``pstats.Stats.dump_stats``."""
+        profile_stats = self.stats()
+        return marshal.dumps(profile_stats.stats) if profile_stats else None
+
+    def pstats_text(self, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        profile_stats = self.stats()
+        if profile_stats is None:
+            return None
+        output = io.StringIO()
+        profile_stats.stream = output
+        profile_stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def speedscope(self) -> Optional[dict]:
+        if self._sampler is None or not self.samples:
+            return None
+        return self._sampler.speedscope(f"fake_carecloud {', '.join(self.config.routes)}")
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles the requests the profiler picks. A single check when disabled."""
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.config.enabled or scope["type"] != "http" or not self.profiler.should_profile(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        generation = self.profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.stop(generation)
@@ -0,0 +1,133 @@
+"""Column projections for read-only list endpoints.
+
+Selecting columns instead of entities returns plain rows that the session
+doesn't track, and the helpers below turn them straight into the JSON
+shapes of the response schemas, skipping the ORM and Pydantic copies.
+"""
+
+from models import Patient, PatientAddress, PatientPhone, Appointment, ArchivedAppointment, Provider, Location
+
+PATIENT_COLUMNS = (Patient.id, Patient.first_name, Patient.last_name, Patient.date_of_birth)
+
+PATIENT_ADDRESS_COLUMNS = (
+    PatientAddress.patient_id, PatientAddress.line1, PatientAddress.line2, PatientAddress.line3,
+    PatientAddress.city, PatientAddress.state, PatientAddress.zip_code, PatientAddress.country_name,
+    PatientAddress.is_primary,
+)
+
+PATIENT_PHONE_COLUMNS = (
+    PatientPhone.patient_id, PatientPhone.phone_number, PatientPhone.phone_type_code,
+    PatientPhone.extension, PatientPhone.is_primary,
+)
+
+APPOINTMENT_FIELDS = (
+    "id", "start_time", "end_time", "provider_id", "location_id",
+    "visit_reason_id", "resource_id", "patient_id", "status", "series_id",
+)
+APPOINTMENT_COLUMNS = tuple(getattr(Appointment, name) for name in APPOINTMENT_FIELDS)
+ARCHIVED_APPOINTMENT_COLUMNS = tuple(getattr(ArchivedAppointment, name) for name in APPOINTMENT_FIELDS)
+
+PROVIDER_COLUMNS = (
+    Provider.id, Provider.npi, Provider.name, Provider.email, Provider.phone_number,
+    Provider.specialty_name, Provider.specialty_taxonomy, Provider.last_name, Provider.first_name,
+)
+
+LOCATION_COLUMNS = (
+    Location.id, Location.name, Location.is_visible_appointment_scheduler, Location.place_of_service_code,
+    Location.address_line1, Location.address_line2, Location.address_line3, Location.city,
+    Location.zip_code, Location.county_fips, Location.county_name, Location.latitude,
+    Location.longitude, Location.state_name, Location.country_name, Location.phone_number,
+    Location.phone_type, Location.phone_ext,
+)
+
+
+def patient_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "first_name": row.first_name,
+        "last_name": row.last_name,
+        "date_of_birth": row.date_of_birth.isoformat(),
+    }
+
+
+def patient_address_to_dict(row) -> dict:
+    return {
+        "line1": row.line1,
+        "line2": row.line2,
+        "line3": row.line3,
+        "city": row.city,
+        "state": row.state,
+        "zip_code": row.zip_code,
+        "country_name": row.country_name,
+        "is_primary": bool(row.is_primary),
+    }
+
+
+def patient_phone_to_dict(row) -> dict:
+    return {
+        "phone_number": row.phone_number,
+        "phone_type_code": row.phone_type_code,
+        "extension": row.extension,
+        "is_primary": bool(row.is_primary),
+    }
+
+
+def appointment_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "start_time": row.start_time.isoformat(),
+        "end_time": row.end_time.isoformat(),
+        "provider_id": row.provider_id,
+        "location_id": row.location_id,
+        "visit_reason_id": row.visit_reason_id,
+        "resource_id": row.resource_id,
+        "patient_id": row.patient_id,
+        "status": row.status,
+        "series_id": row.series_id,
+    }
+
+
+def provider_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "npi": row.npi,
+        "name": row.name,
+        "email": row.email,
+        "phone_number": row.phone_number,
+        "specialty": {
+            "name": row.specialty_name or "",
+            "taxonomy": row.specialty_taxonomy or "",
+        },
+        "last_name": row.last_name,
+        "first_name": row.first_name,
+    }
+
+
+def location_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "is_visible_appointment_scheduler": bool(row.is_visible_appointment_scheduler),
+        "place_of_service_code": row.place_of_service_code,
+        "address": {
+            "line1": row.address_line1,
+            "line2": row.address_line2,
+            "line3": row.address_line3,
+            "city": row.city,
+            "zip_code": row.zip_code,
+            "county_fips": row.county_fips,
+            "county_name": row.county_name,
+            "latitude": float(row.latitude) if row.latitude else None,
+            "longitude": float(row.longitude) if row.longitude else None,
+            "state_name": row.state_name,
+            "country_name": row.country_name,
+        },
+        "phones": [
+            {
+                "phone_number": row.phone_number,
+                "phone_type": row.phone_type or "Main",
+                "phone_ext": row.phone_ext,
+                "is_primary": True,
+            }
+        ] if row.phone_number else [],
+    }
@@ -0,0 +1,149 @@
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
+from auth import security, verify_token
+
+logger = logging.getLogger("fake_carecloud.rate_limit")
+
+# Route groups that get their own quota
+GROUPS = ("patients", "appointments", "reference_data")
+
+# Idle buckets are dropped once this many exist and they have refilled completely
+SWEEP_THRESHOLD = 10000
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RateLimit:
+    """A token bucket per (verified) access token: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def consume(self, key: str, now: float) -> Tuple[bool, TokenBucket]:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= SWEEP_THRESHOLD:
+                self.sweep(now)
+            bucket = self.buckets[key] = TokenBucket(self.burst, now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True, bucket
+        return False, bucket
+
+    def sweep(self, now: float):
+        refill_time = self.burst / self.rate
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if now - bucket.updated < refill_time
+        }
+
+    def headers(self, bucket: TokenBucket) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.burst),
+            "X-RateLimit-Remaining": str(int(bucket.tokens)),
+            "X-RateLimit-Reset": str(math.ceil((self.burst - bucket.tokens) / self.rate)),
+        }
+
+
+def parse_limit(value: Optional[str]) -> Optional[RateLimit]:
+    """Parse ``"RATE"`` or ``"RATE:BURST"`` (requests per second). Empty or 0 means unlimited."""
+    if not value:
+        return None
+    rate, _, burst = value.partition(":")
+    rate = float(rate)
+    if rate <= 0:
+        return None
+    return RateLimit(rate, int(burst) if burst else max(1, math.ceil(rate)))
+
+
+def load_limits() -> Dict[str, Optional[RateLimit]]:
+    default = os.getenv("FAKE_CARECLOUD_RATE_LIMIT")
+    limits = {
+        group: parse_limit(os.getenv(f"FAKE_CARECLOUD_RATE_LIMIT_{group.upper()}", default))
+        for group in GROUPS
+    }
+    for group, limit in limits.items():
+        if limit:
+            logger.info(f"Rate limit for {group}: {limit.rate}/s, burst {limit.burst}")
+    return limits
+
+
+limits = load_limits()
+
+
+def rate_limit(group: str):
+    """Dependency enforcing the quota of ``group`` for the caller's access token.
+
+    Runs after verify_token (cached, so checked once per request), so only
+    valid tokens get buckets; made-up tokens are refused with 401 instead.
+    """
+
+    async def check_rate_limit(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        _: bool = Depends(verify_token)
+    ):
+        limit = limits.get(group)
+        if limit is None:
+            return
+
+        allowed, bucket = limit.consume(credentials.credentials, time.monotonic())
+        headers = limit.headers(bucket)
+        if not allowed:
+            headers["Retry-After"] = str(math.ceil((1 - bucket.tokens) / limit.rate))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers=headers,
+            )
+        # Set on the way out by RateLimitHeadersMiddleware, since handlers may return their own Response
+        request.state.rate_limit_headers = headers
+
+    return check_rate_limit
+
+
+class RateLimitHeadersMiddleware:
+    """Adds the headers of the quota ``rate_limit`` charged to the response.
+
+    Headers set on an injected ``Response`` are dropped when the handler
+    returns a Response of its own, as the prebuilt JSON lists do.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(limits.values()):
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with the Request the dependency sees
+        state = scope.setdefault("state", {})
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = state.get("rate_limit_headers")
+                if headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
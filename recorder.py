@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("fake_carecloud.recorder")
+
+# Token requests would revoke the replayer's token, and debug/UI traffic isn't load
+SKIPPED_PREFIXES = ("/oauth2", "/debug", "/ui", "/static", "/docs", "/openapi.json", "/favicon.ico")
+
+# Responses whose created ID is recorded, so replays can map old IDs to new ones
+CREATE_ROUTES = {
+    "/v2/patients": "patient",
+    "/v2/appointments": "appointment",
+    "/v2/appointment_series": "series",
+}
+
+# Records created along with that ID (a series' occurrences), recorded in order
+CREATED_WITH = {
+    "/v2/appointment_series": "appointments",
+}
+
+# Larger bodies (bulk imports) are left out of the log; only their size is recorded
+MAX_RECORDED_BODY = 64 * 1024
+
+
+class RequestRecorder:
+    """Appends one compact JSON line per request to an append-only log.
+
+    Keys: ``t`` wall-clock start time in seconds, ``m`` method,
+    ``p`` path, ``q`` query string, ``b`` body (``c`` its content type when it is
+    not JSON), or ``x`` its size in bytes when it was too large to record,
+    ``s`` status, ``d`` duration in ms, ``r`` the ID created by the request, if
+    any, and ``o`` the IDs of the records created along with it.
+    """
+
+    def __init__(self):
+        self.file = None
+
+    @property
+    def active(self) -> bool:
+        return self.file is not None
+
+    def open(self, path: str):
+        self.close()
+        self.file = open(path, "a", buffering=1, encoding="utf-8")
+        logger.info(f"Recording requests to {path}")
+
+    def write(self, entry: dict):
+        if self.file is not None:
+            self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+recorder = RequestRecorder()
+
+
+def load_from_env():
+    """Start recording to FAKE_CARECLOUD_RECORD_FILE, if set."""
+    path = os.getenv("FAKE_CARECLOUD_RECORD_FILE")
+    if path:
+        recorder.open(path)
+
+
+class RecorderMiddleware:
+    def __init__(self, app, recorder: RequestRecorder = recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if not self.recorder.active or scope["type"] != "http" or scope["path"].startswith(SKIPPED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        started = time.monotonic()
+        body = bytearray()
+        body_size = 0
+        response = {"status": 0}
+        create_key = CREATE_ROUTES.get(scope["path"]) if scope["method"] == "POST" else None
+        response_body = bytearray()
+
+        async def recording_receive():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= MAX_RECORDED_BODY:
+                    body.extend(chunk)
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body" and create_key:
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            entry = {
+                "t": round(started_at, 4),
+                "m": scope["method"],
+                "p": scope["path"],
+                "s": response["status"],
+                "d": round((time.monotonic() - started) * 1000, 2),
+            }
+            if scope["query_string"]:
+                entry["q"] = scope["query_string"].decode("latin-1")
+            if body_size > MAX_RECORDED_BODY:
+                entry["x"] = body_size
+            elif body:
+                try:
+                    entry["b"] = json.loads(body)
+                except ValueError:
+                    entry["b"] = body.decode("utf-8", "replace")
+                    headers = dict(scope["headers"])
+                    entry["c"] = headers.get(b"content-type", b"").decode("latin-1")
+            if create_key and response["status"] == 200:
+                try:
+                    created = json.loads(response_body)
+                    entry["r"] = created[create_key]
+                    if scope["path"] in CREATED_WITH:
+                        entry["o"] = created[CREATED_WITH[scope["path"]]]
+                except (ValueError, KeyError, TypeError):
+                    pass
+            self.recorder.write(entry)
@@ -0,0 +1,127 @@
+"""Recurrence rules for appointment series.
+
+A subset of RFC 5545 RRULE: ``FREQ=DAILY`` or ``FREQ=WEEKLY`` with optional
+``INTERVAL`` and ``BYDAY``, ending after ``COUNT`` occurrences or at ``UNTIL``.
+"Twice weekly for 8 weeks" is ``FREQ=WEEKLY;BYDAY=MO,TH;COUNT=16``.
+"""
+
+from datetime import datetime, timedelta, timezone
+from itertools import count as counter
+from typing import Iterator, Optional, Tuple
+from dates import parse_local_datetime, to_naive_utc
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# A series is materialized when it is booked, so it must end, and not too far out
+MAX_OCCURRENCES = 520
+
+
+def _parse_until(value: str) -> datetime:
+    """UNTIL with a ``Z`` or offset is an instant; without one it is wall clock time, like the start's."""
+    utc = value.endswith("Z")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value.rstrip("Z"), fmt)
+        except ValueError:
+            continue
+        return until.replace(tzinfo=timezone.utc) if utc else until
+    return parse_local_datetime(value)
+
+
+class RecurrenceRule:
+    def __init__(
+        self,
+        freq: str,
+        interval: int = 1,
+        by_day: Optional[Tuple[int, ...]] = None,
+        count: Optional[int] = None,
+        until: Optional[datetime] = None,
+    ):
+        self.freq = freq
+        self.interval = interval
+        self.by_day = by_day
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, rule: str) -> "RecurrenceRule":
+        """Parse ``FREQ=...;...`` (an optional ``RRULE:`` prefix is allowed). Raises ValueError."""
+        rule = rule.strip()
+        if rule.upper().startswith("RRULE:"):
+            rule = rule[6:]
+        parts = {}
+        for part in filter(None, rule.split(";")):
+            name, separator, value = part.partition("=")
+            if not separator:
+                raise ValueError(f"Invalid rule part {part!r}")
+            parts[name.strip().upper()] = value.strip().upper()
+
+        unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+        if unsupported:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unsupported))}")
+        freq = parts.get("FREQ")
+        if freq not in ("DAILY", "WEEKLY"):
+            raise ValueError("FREQ must be DAILY or WEEKLY")
+
+        interval = int(parts.get("INTERVAL", "1"))
+        if interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+
+        by_day = None
+        if "BYDAY" in parts:
+            days = parts["BYDAY"].split(",")
+            unknown = [day for day in days if day not in WEEKDAYS]
+            if unknown:
+                raise ValueError(f"Unknown BYDAY values: {', '.join(unknown)}")
+            by_day = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+        if count is None and until is None:
+            raise ValueError("The rule needs COUNT or UNTIL")
+        if count is not None and not 1 <= count <= MAX_OCCURRENCES:
+            raise ValueError(f"COUNT must be between 1 and {MAX_OCCURRENCES}")
+        return cls(freq, interval, by_day, count, until)
+
+    def _candidates(self, start: datetime) -> Iterator[datetime]:
+        # As with DTSTART in RFC 5545, the start is the first occurrence even on a day BYDAY leaves out
+        yield start
+        if self.freq == "DAILY":
+            for step in counter(1):
+                occurrence = start + timedelta(days=step * self.interval)
+                if self.by_day is None or occurrence.weekday() in self.by_day:
+                    yield occurrence
+            return
+        # Weekly: the chosen weekdays of every ``interval``-th week, starting with start's week
+        days = self.by_day or (start.weekday(),)
+        week_start = start - timedelta(days=start.weekday())
+        for step in counter():
+            week = week_start + timedelta(weeks=step * self.interval)
+            for day in days:
+                occurrence = week + timedelta(days=day)
+                if occurrence > start:
+                    yield occurrence
+
+    def _after_until(self, occurrence: datetime) -> bool:
+        until = self.until
+        if occurrence.tzinfo is None:
+            # A naive start is UTC
+            until = to_naive_utc(until)
+        elif until.tzinfo is None:
+            occurrence = occurrence.replace(tzinfo=None)
+        return occurrence > until
+
+    def occurrences(self, start: datetime) -> Iterator[datetime]:
+        """Start times, generated on demand from ``start`` (the first occurrence's slot).
+
+        Weekdays and weeks are those of ``start``'s own UTC offset, so pass it
+        in the client's offset rather than converted to UTC.
+        """
+        for number, occurrence in enumerate(self._candidates(start), 1):
+            if self.until is not None and self._after_until(occurrence):
+                return
+            if number > MAX_OCCURRENCES:
+                raise ValueError(f"The rule has more than {MAX_OCCURRENCES} occurrences")
+            yield occurrence
+            if number == self.count:
+                return
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Command line tool to replay requests recorded by the fake CareCloud API.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import os
+import time
+import click
+import httpx
+from carecloud_client import TokenCache, TokenError
+
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+def load_records(path):
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    # Lines are written as requests finish, so restore the order they started in
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Replayer:
+    """Re-issues recorded requests, mapping IDs created during the recording to new ones."""
+
+    def __init__(self, client, concurrency):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.created = {}
+        self.latencies = []
+        self.statuses = {}
+        self.mismatches = 0
+        self.skipped = 0
+
+    def expect_id(self, old_id):
+        self.created[old_id] = asyncio.get_running_loop().create_future()
+
+    async def substitute(self, text):
+        for old_id in set(UUID_PATTERN.findall(text)):
+            future = self.created.get(old_id)
+            if future is not None:
+                new_id = await future
+                if new_id:
+                    text = text.replace(old_id, new_id)
+        return text
+
+    async def send(self, record):
+        old_id = record.get("r")
+        new_id = None
+        old_related = record.get("o") or []
+        new_related = []
+        try:
+            if "x" in record:
+                # The body was too large to record (a bulk import)
+                self.skipped += 1
+                return
+            path = await self.substitute(record["p"])
+            if record.get("q"):
+                path = f"{path}?{await self.substitute(record['q'])}"
+
+            content = None
+            headers = {}
+            if "b" in record:
+                if "c" in record:
+                    content = await self.substitute(record["b"])
+                    headers["Content-Type"] = record["c"]
+                else:
+                    content = await self.substitute(json.dumps(record["b"]))
+                    headers["Content-Type"] = "application/json"
+
+            async with self.semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await self.client.request(record["m"], path, content=content, headers=headers)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    response = None
+                    status = type(e).__name__
+                self.latencies.append((time.perf_counter() - started) * 1000)
+
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status != record.get("s"):
+                self.mismatches += 1
+            if old_id and response is not None and response.status_code == 200:
+                created = response.json()
+                values = iter(created.values())
+                new_id = next(values, None)
+                if old_related:
+                    # A series' occurrences come back in the same order as recorded
+                    new_related = next(values, None) or []
+        finally:
+            if old_id:
+                self.created[old_id].set_result(new_id)
+            for index, old_related_id in enumerate(old_related):
+                self.created[old_related_id].set_result(new_related[index] if index < len(new_related) else None)
+
+
+async def replay(url, records, speed, concurrency, refresh_token):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        token = await TokenCache(url, refresh_token=refresh_token).aget(client)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        replayer = Replayer(client, concurrency)
+        for record in records:
+            if record.get("r"):
+                replayer.expect_id(record["r"])
+            for old_id in record.get("o") or []:
+                replayer.expect_id(old_id)
+
+        started = time.perf_counter()
+        first = records[0]["t"]
+        tasks = []
+        for record in records:
+            if speed > 0:
+                delay = started + (record["t"] - first) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(replayer.send(record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return replayer, elapsed
+
+
+@click.command()
+@click.argument("record_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--url",
+    default=lambda: os.getenv("FAKE_CARECLOUD_URL", "http://127.0.0.1:7000"),
+    help="Base URL of the fake CareCloud API"
+)
+@click.option(
+    "--speed",
+    default=1.0,
+    show_default=True,
+    help="Replay speed multiplier (1 = recorded pace, 10 = ten times faster, 0 = as fast as possible)"
+)
+@click.option(
+    "--concurrency", "-c",
+    default=50,
+    show_default=True,
+    help="Maximum requests in flight (also the connection pool size)"
+)
+@click.option(
+    "--refresh-token",
+    default="dummy",
+    help="Refresh token used to get an access token"
+)
+@click.option(
+    "--json",
+    "output_json",
+    is_flag=True,
+    help="Output the report as JSON"
+)
+def main(record_file, url, speed, concurrency, refresh_token, output_json):
+    """Replay a request log recorded with FAKE_CARECLOUD_RECORD_FILE.
+
+    Examples:
+
+      replay.py requests.log                 # Replay at the recorded pace
+
+      replay.py requests.log --speed 10      # Replay ten times faster
+
+      replay.py requests.log --speed 0 -c 200  # Replay as fast as possible
+    """
+
+    records = load_records(record_file)
+    if not records:
+        click.echo("Error: No requests recorded", err=True)
+        sys.exit(1)
+
+    try:
+        replayer, elapsed = asyncio.run(replay(url, records, speed, concurrency, refresh_token))
+    except httpx.ConnectError:
+        click.echo(f"Error: Could not connect to {url}", err=True)
+        click.echo("Make sure the fake CareCloud API server is running.", err=True)
+        sys.exit(1)
+    except TokenError as e:
+        click.echo(f"Error: Could not get an access token ({e})", err=True)
+        sys.exit(1)
+
+    recorded = [record["d"] for record in records if "d" in record]
+    report = {
+        "requests": len(records),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(records) / elapsed, 1) if elapsed else None,
+        "status_mismatches": replayer.mismatches,
+        "skipped": replayer.skipped,
+        "statuses": {str(status): count for status, count in sorted(replayer.statuses.items(), key=str)},
+        "latency_ms": {
+            "p50": round(percentile(replayer.latencies, 0.50), 2),
+            "p90": round(percentile(replayer.latencies, 0.90), 2),
+            "p99": round(percentile(replayer.latencies, 0.99), 2),
+            "max": round(max(replayer.latencies, default=0.0), 2),
+        },
+        "recorded_latency_ms": {
+            "p50": round(percentile(recorded, 0.50), 2),
+            "p90": round(percentile(recorded, 0.90), 2),
+            "p99": round(percentile(recorded, 0.99), 2),
+        },
+    }
+
+    if output_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+
+    click.echo(f"Replayed {report['requests']} requests in {report['elapsed_seconds']}s "
+               f"({report['requests_per_second']} req/s)")
+    click.echo("Statuses: " + ", ".join(f"{status}: {count}" for status, count in report["statuses"].items()))
+    click.echo(f"Status mismatches vs recording: {report['status_mismatches']}")
+    if report["skipped"]:
+        click.echo(f"Skipped {report['skipped']} requests whose bodies were too large to record")
+    latency = report["latency_ms"]
+    recorded_latency = report["recorded_latency_ms"]
+    click.echo(f"Latency ms  p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    click.echo(f"Recorded ms p50 {recorded_latency['p50']}  p90 {recorded_latency['p90']}  p99 {recorded_latency['p99']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
-from database import get_db
+from typing import Optional
+from database import get_db, get_read_db
 from models import Appointment, Patient
 from schemas import (
-    AppointmentRequest, AppointmentCreateResponse, AppointmentResponse
+    AppointmentRequest, AppointmentCreateResponse, AppointmentResponse,
+    AppointmentStatus, AppointmentStatusUpdate, AppointmentListResponse
 )
 from auth import verify_token
+from rate_limit import rate_limit
+from dates import parse_datetime
+from ids import new_id
 from datetime import datetime
-import uuid
+from types import SimpleNamespace
+from appointment_status import CANCELLED, transition_error
+from projections import APPOINTMENT_COLUMNS
+from serialization import APPOINTMENT_PAGE, APPOINTMENTS, json_response
+import archive
+import base64
+import stats
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(rate_limit("appointments"))])
 
 @router.post("/appointments", response_model=AppointmentCreateResponse)
 async def create_appointment(
@@ -30,8 +42,8 @@ async def create_appointment(
     
     # Parse datetime strings
     try:
-        start_time = datetime.fromisoformat(appointment_data.appointment.start_time.replace('Z', '+00:00'))
-        end_time = datetime.fromisoformat(appointment_data.appointment.end_time.replace('Z', '+00:00'))
+        start_time = parse_datetime(appointment_data.appointment.start_time)
+        end_time = parse_datetime(appointment_data.appointment.end_time)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,7 +51,7 @@ async def create_appointment(
         )
     
     # Create appointment
-    appointment_id = str(uuid.uuid4())
+    appointment_id = new_id()
     appointment = Appointment(
         id=appointment_id,
         start_time=start_time,
@@ -53,20 +65,81 @@ async def create_appointment(
     )
     
     db.add(appointment)
+    stats.record_appointment_created(db, appointment)
     db.commit()
     
     return AppointmentCreateResponse(appointment=appointment_id)
 
+def encode_cursor(start_time: datetime, appointment_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{start_time.isoformat()}|{appointment_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        start_time, appointment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(start_time), appointment_id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+@router.get("/appointments", response_model=AppointmentListResponse)
+async def list_appointments(
+    status_filter: Optional[AppointmentStatus] = Query(None, alias="status"),
+    start_from: Optional[str] = None,
+    start_to: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_token)
+):
+    """Appointments in (start_time, id) order, a page at a time.
+
+    With ``status`` this reads one status queue (``scheduled`` is the queue of
+    appointments pending confirmation) straight from the (status, start_time, id)
+    index. Pages continue from ``after``, the ``next`` cursor of the previous page,
+    rather than an offset, so each page costs the same.
+    """
+    query = select(*APPOINTMENT_COLUMNS)
+    if status_filter:
+        query = query.where(Appointment.status == status_filter)
+    try:
+        if start_from:
+            query = query.where(Appointment.start_time >= parse_datetime(start_from))
+        if start_to:
+            query = query.where(Appointment.start_time < parse_datetime(start_to))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid datetime format"
+        )
+    if after:
+        query = query.where(tuple_(Appointment.start_time, Appointment.id) > decode_cursor(after))
+    
+    rows = db.execute(query.order_by(Appointment.start_time, Appointment.id).limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1].start_time, rows[limit - 1].id) if len(rows) > limit else None
+    
+    return json_response(APPOINTMENT_PAGE.dump_json({
+        "appointments": APPOINTMENTS.to_dicts(rows[:limit]),
+        "next": next_cursor,
+    }))
+
 @router.get("/appointments/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(
     appointment_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: bool = Depends(verify_token)
 ):
     appointment = db.query(Appointment).filter(
         Appointment.id == appointment_id
     ).first()
     
+    if not appointment:
+        # Cancelled and past appointments may have been archived
+        appointment = archive.get_archived_appointment(db, appointment_id)
+    
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -82,7 +155,8 @@ async def get_appointment(
         visit_reason_id=appointment.visit_reason_id,
         resource_id=appointment.resource_id,
         patient_id=appointment.patient_id,
-        status=appointment.status
+        status=appointment.status,
+        series_id=appointment.series_id
     )
 
 @router.put("/appointments/{appointment_id}", response_model=AppointmentResponse)
@@ -96,6 +170,10 @@ async def update_appointment(
         Appointment.id == appointment_id
     ).first()
     
+    if not appointment:
+        # Archived appointments move back to the active table when modified
+        appointment = archive.restore_appointment(db, appointment_id)
+    
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -104,14 +182,20 @@ async def update_appointment(
     
     # Parse datetime strings
     try:
-        start_time = datetime.fromisoformat(appointment_data.appointment.start_time.replace('Z', '+00:00'))
-        end_time = datetime.fromisoformat(appointment_data.appointment.end_time.replace('Z', '+00:00'))
+        start_time = parse_datetime(appointment_data.appointment.start_time)
+        end_time = parse_datetime(appointment_data.appointment.end_time)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid datetime format"
         )
     
+    before = SimpleNamespace(
+        start_time=appointment.start_time,
+        provider_id=appointment.provider_id,
+        status=appointment.status
+    )
+    
     # Update appointment
     appointment.start_time = start_time
     appointment.end_time = end_time
@@ -121,6 +205,7 @@ async def update_appointment(
     appointment.resource_id = appointment_data.appointment.resource_id
     appointment.updated_at = datetime.utcnow()
     
+    stats.record_appointment_updated(db, before, appointment)
     db.commit()
     
     return AppointmentResponse(
@@ -132,8 +217,62 @@ async def update_appointment(
         visit_reason_id=appointment.visit_reason_id,
         resource_id=appointment.resource_id,
         patient_id=appointment.patient_id,
+        status=appointment.status,
+        series_id=appointment.series_id
+    )
+
+@router.post("/appointments/{appointment_id}/status", response_model=AppointmentResponse)
+async def change_appointment_status(
+    appointment_id: str,
+    update: AppointmentStatusUpdate,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    appointment = db.query(Appointment).filter(
+        Appointment.id == appointment_id
+    ).first()
+    
+    if not appointment:
+        # Archived appointments move back to the active table when modified
+        appointment = archive.restore_appointment(db, appointment_id)
+    
+    if not appointment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Appointment not found"
+        )
+    
+    error = transition_error(appointment.status, update.status)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=error
+        )
+    
+    before = SimpleNamespace(
+        start_time=appointment.start_time,
+        provider_id=appointment.provider_id,
         status=appointment.status
     )
+    
+    appointment.status = update.status
+    appointment.updated_at = datetime.utcnow()
+    
+    stats.record_appointment_updated(db, before, appointment)
+    db.commit()
+    
+    return AppointmentResponse(
+        id=appointment.id,
+        start_time=appointment.start_time.isoformat(),
+        end_time=appointment.end_time.isoformat(),
+        provider_id=appointment.provider_id,
+        location_id=appointment.location_id,
+        visit_reason_id=appointment.visit_reason_id,
+        resource_id=appointment.resource_id,
+        patient_id=appointment.patient_id,
+        status=appointment.status,
+        series_id=appointment.series_id
+    )
 
 @router.delete("/appointments/{appointment_id}")
 async def cancel_appointment(
@@ -145,16 +284,37 @@ async def cancel_appointment(
         Appointment.id == appointment_id
     ).first()
     
+    if not appointment:
+        # Archived appointments move back to the active table when modified
+        appointment = archive.restore_appointment(db, appointment_id)
+    
     if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
         )
     
+    if appointment.status == CANCELLED:
+        return {"message": "Appointment cancelled successfully"}
+    
+    error = transition_error(appointment.status, CANCELLED)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=error
+        )
+    
+    before = SimpleNamespace(
+        start_time=appointment.start_time,
+        provider_id=appointment.provider_id,
+        status=appointment.status
+    )
+    
     # Mark as cancelled instead of deleting
-    appointment.status = "cancelled"
+    appointment.status = CANCELLED
     appointment.updated_at = datetime.utcnow()
     
+    stats.record_appointment_updated(db, before, appointment)
     db.commit()
     
     return {"message": "Appointment cancelled successfully"}
\ No newline at end of file
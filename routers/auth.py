@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Form, Request
 from sqlalchemy.orm import Session
 from database import get_db
 from schemas import TokenResponse, TokenRequest
-from auth import create_access_token
+from auth import create_access_token, ACCESS_TOKEN_LIFETIME
 import json
 
 router = APIRouter()
@@ -52,5 +52,6 @@ async def get_access_token(
     
     return TokenResponse(
         access_token=access_token,
-        token_type="Bearer"
+        token_type="Bearer",
+        expires_in=int(ACCESS_TOKEN_LIFETIME.total_seconds())
     )
\ No newline at end of file
@@ -1,20 +1,179 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from sqlalchemy import select, union_all
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Patient, Appointment
-from schemas import PatientResponse, AppointmentResponse
+from database import ISOLATED_PREFIX, get_database, get_db, get_read_db, isolated_databases, tenant_databases
+from schemas import PatientResponse, AppointmentResponse, FaultConfig, FaultStatus, ProfileConfig, ProfileStatus
 from typing import List
+from faults import injector
+from profiling import profiler
+from projections import PATIENT_COLUMNS, APPOINTMENT_COLUMNS, ARCHIVED_APPOINTMENT_COLUMNS
+from serialization import APPOINTMENTS, PATIENTS, json_response
+from tenancy import TENANT_ID_PATTERN
+import archive
+import migrations
+import stats
 
 router = APIRouter()
 
 @router.get("/patients", response_model=List[PatientResponse])
-async def debug_patients(db: Session = Depends(get_db)):
+async def debug_patients(db: Session = Depends(get_read_db)):
     """Debug endpoint to return all patients in the database."""
-    patients = db.query(Patient).all()
-    return patients
+    rows = db.execute(select(*PATIENT_COLUMNS))
+    return json_response(PATIENTS.dump_json(rows))
 
 @router.get("/appointments", response_model=List[AppointmentResponse])
-async def debug_appointments(db: Session = Depends(get_db)):
+async def debug_appointments(include_archived: bool = False, db: Session = Depends(get_read_db)):
     """Debug endpoint to return all appointments in the database."""
-    appointments = db.query(Appointment).all()
-    return appointments
\ No newline at end of file
+    query = select(*APPOINTMENT_COLUMNS)
+    if include_archived:
+        query = union_all(query, select(*ARCHIVED_APPOINTMENT_COLUMNS))
+    rows = db.execute(query)
+    return json_response(APPOINTMENTS.dump_json(rows))
+
+@router.get("/tenants")
+async def debug_tenants():
+    """Debug endpoint to list the tenant databases that currently have open engines."""
+    return {
+        "enabled": tenant_databases.enabled,
+        "max_open": tenant_databases.max_open,
+        "idle_seconds": tenant_databases.idle_seconds,
+        "open": [database.tenant for database in tenant_databases.open_databases()]
+    }
+
+@router.post("/tenants/{tenant}")
+def debug_create_tenant(tenant: str):
+    """Debug endpoint to create (and seed) a tenant's database, or just open it if it exists."""
+    if not tenant_databases.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tenancy is not enabled"
+        )
+    if not TENANT_ID_PATTERN.match(tenant):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid tenant ID"
+        )
+    created = not tenant_databases.exists(tenant)
+    tenant_databases.get(tenant)
+    return {"tenant": tenant, "created": created}
+
+@router.get("/isolation")
+async def debug_isolation():
+    """Debug endpoint to list the isolated databases (X-Isolation-ID) that currently exist."""
+    return {
+        "enabled": isolated_databases.enabled,
+        "template": isolated_databases.template_url,
+        "max_open": isolated_databases.max_open,
+        "idle_seconds": isolated_databases.idle_seconds,
+        "open": [database.tenant.removeprefix(ISOLATED_PREFIX) for database in isolated_databases.open_databases()]
+    }
+
+@router.delete("/isolation/{isolation_id}")
+async def debug_discard_isolated_database(isolation_id: str):
+    """Debug endpoint to discard an isolated database; the next request with its ID starts from the template again."""
+    if not isolated_databases.discard(ISOLATED_PREFIX + isolation_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Isolated database not found"
+        )
+    return {"message": "Isolated database discarded"}
+
+@router.get("/migrations")
+async def debug_migrations():
+    """Debug endpoint to show the schema version and the progress of online index builds."""
+    database = get_database()
+    builds = migrations.index_builds.get(database.tenant)
+    return {
+        "version": migrations.schema_version(database.engine),
+        "latest": migrations.LATEST_VERSION,
+        "indexes": builds.as_dict() if builds else None
+    }
+
+@router.post("/archive")
+def debug_archive(db: Session = Depends(get_db)):
+    """Debug endpoint to archive cancelled and past appointments now."""
+    return {"archived": archive.archive_appointments(db)}
+
+@router.post("/stats/rebuild")
+def debug_rebuild_stats(db: Session = Depends(get_db)):
+    """Debug endpoint to recompute the statistics counters from scratch."""
+    stats.rebuild(db)
+    return stats.get_stats(db)
+
+@router.get("/faults", response_model=FaultStatus)
+async def debug_get_faults():
+    """Debug endpoint to show the active fault injection rules and counts."""
+    return FaultStatus(config=injector.config, injected=injector.injected)
+
+@router.put("/faults", response_model=FaultStatus)
+async def debug_set_faults(config: FaultConfig):
+    """Debug endpoint to replace the fault injection rules (resets seeds and counts)."""
+    injector.configure(config)
+    return FaultStatus(config=injector.config, injected=injector.injected)
+
+@router.delete("/faults", response_model=FaultStatus)
+async def debug_clear_faults():
+    """Debug endpoint to turn fault injection off."""
+    injector.configure(FaultConfig(enabled=False))
+    return FaultStatus(config=injector.config, injected=injector.injected)
+
+def profile_status() -> ProfileStatus:
+    return ProfileStatus(config=profiler.config, profiled_requests=profiler.profiled_requests, samples=profiler.samples)
+
+def no_profile_data(kind: str):
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"No {kind} data collected; profile some requests in {kind} mode first"
+    )
+
+@router.get("/profile", response_model=ProfileStatus)
+async def debug_get_profile():
+    """Debug endpoint to show the profiler configuration and how much it collected."""
+    return profile_status()
+
+@router.put("/profile", response_model=ProfileStatus)
+async def debug_set_profile(config: ProfileConfig):
+    """Debug endpoint to start profiling matching requests (discards earlier results)."""
+    profiler.configure(config)
+    return profile_status()
+
+@router.delete("/profile", response_model=ProfileStatus)
+async def debug_stop_profile():
+    """Debug endpoint to stop profiling; collected results stay available."""
+    profiler.disable()
+    return profile_status()
+
+@router.get("/profile/pstats")
+async def debug_profile_pstats():
+    """Debug endpoint to download the aggregated cProfile results (open with pstats or snakeviz)."""
+    data = profiler.pstats_dump()
+    if data is None:
+        raise no_profile_data("cprofile")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="fake_carecloud.prof"'}
+    )
+
+@router.get("/profile/text", response_class=PlainTextResponse)
+async def debug_profile_text(sort: str = "cumulative", limit: int = 50):
+    """Debug endpoint to show the top functions of the aggregated cProfile results."""
+    try:
+        text = profiler.pstats_text(sort, limit)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown sort key: {sort}")
+    if text is None:
+        raise no_profile_data("cprofile")
+    return text
+
+@router.get("/profile/speedscope")
+async def debug_profile_speedscope():
+    """Debug endpoint to download the sampled stacks in speedscope format."""
+    data = profiler.speedscope()
+    if data is None:
+        raise no_profile_data("sampling")
+    return JSONResponse(
+        data,
+        headers={"Content-Disposition": 'attachment; filename="fake_carecloud.speedscope.json"'}
+    )
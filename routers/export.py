@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from auth import verify_token
+from database import get_database
+from rate_limit import rate_limit
+import export
+
+router = APIRouter()
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def streaming_export(request: Request, name: str, query, fields, fmt: str) -> StreamingResponse:
+    error = export.format_available(fmt)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+
+    gzip = accepts_gzip(request)
+    media_type, extension = export.FORMATS[fmt]
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        export.export_rows(get_database(), query, fields, fmt, gzip=gzip),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+@router.get("/export/patients", dependencies=[Depends(rate_limit("patients"))])
+async def export_patients(
+    request: Request,
+    format: str = "csv",
+    _: bool = Depends(verify_token)
+):
+    return streaming_export(request, "patients", export.patients_query(), export.PATIENT_FIELDS, format)
+
+
+@router.get("/export/appointments", dependencies=[Depends(rate_limit("appointments"))])
+async def export_appointments(
+    request: Request,
+    format: str = "csv",
+    include_archived: bool = False,
+    _: bool = Depends(verify_token)
+):
+    return streaming_export(
+        request, "appointments", export.appointments_query(include_archived), export.APPOINTMENT_FIELDS, format
+    )
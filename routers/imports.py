@@ -0,0 +1,83 @@
+import tempfile
+import zlib
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from auth import verify_token
+from database import get_db
+from rate_limit import rate_limit
+import importer
+
+router = APIRouter()
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# Uploads are spooled to disk beyond this size
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def request_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        fmt = CONTENT_TYPES.get(content_type)
+    if fmt not in importer.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"
+        )
+    return fmt
+
+
+async def run_import(request: Request, kind: str, fmt: Optional[str], db: Session) -> dict:
+    fmt = request_format(request, fmt)
+
+    # Spool the body so parsing and inserting can run in a worker thread
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    decompressor = zlib.decompressobj(31) if request.headers.get("content-encoding") == "gzip" else None
+    try:
+        async for chunk in request.stream():
+            spool.write(decompressor.decompress(chunk) if decompressor else chunk)
+        if decompressor:
+            spool.write(decompressor.flush())
+    except zlib.error:
+        spool.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid gzip body")
+    spool.seek(0)
+
+    try:
+        report = await run_in_threadpool(importer.import_stream, db, kind, importer.text_stream(spool), fmt)
+    except importer.READ_ERRORS as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read the {fmt.upper()} body: {e}"
+        )
+    finally:
+        spool.close()
+    return report.as_dict()
+
+
+@router.post("/import/patients", dependencies=[Depends(rate_limit("patients"))])
+async def import_patients(
+    request: Request,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    return await run_import(request, "patients", format, db)
+
+
+@router.post("/import/appointments", dependencies=[Depends(rate_limit("appointments"))])
+async def import_appointments(
+    request: Request,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    return await run_import(request, "appointments", format, db)
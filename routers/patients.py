@@ -1,15 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional, get_args
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, union_all
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Patient, PatientAddress, PatientPhone
+from database import get_db, get_read_db
+from models import Appointment, ArchivedAppointment, Patient, PatientAddress, PatientPhone
 from schemas import (
     PatientRequest, PatientCreateResponse, PatientSearchRequest, 
-    PatientSearchResponse, PatientResponse
+    PatientSearchResponse, PatientListResponse, PatientRecordResponse, PatientExpansion,
+    PatientBatchGetRequest, PatientBatchGetResponse
 )
 from auth import verify_token
-import uuid
+from dates import parse_date
+from ids import new_id
+from matching import DUPLICATE_PATIENT_POLICY, patient_match_key
+from projections import (
+    PATIENT_COLUMNS, PATIENT_ADDRESS_COLUMNS, PATIENT_PHONE_COLUMNS, APPOINTMENT_COLUMNS,
+    ARCHIVED_APPOINTMENT_COLUMNS, patient_to_dict, patient_address_to_dict, patient_phone_to_dict, appointment_to_dict
+)
+from rate_limit import rate_limit
+from serialization import PATIENT_LIST, PATIENT_PAGE, PATIENTS, json_response
+import stats
+
+router = APIRouter(dependencies=[Depends(rate_limit("patients"))])
+
+def _rows_of(columns, patient_id, order):
+    return lambda patient_ids: select(*columns).where(patient_id.in_(patient_ids)).order_by(order)
+
+
+def _appointment_rows(patient_ids):
+    # Archived appointments are still the patient's
+    return union_all(
+        select(*APPOINTMENT_COLUMNS).where(Appointment.patient_id.in_(patient_ids)),
+        select(*ARCHIVED_APPOINTMENT_COLUMNS).where(ArchivedAppointment.patient_id.in_(patient_ids))
+    ).order_by("start_time")
+
+
+# expand name -> (query for the patients' rows, row converter)
+EXPANSIONS = {
+    "addresses": (_rows_of(PATIENT_ADDRESS_COLUMNS, PatientAddress.patient_id, PatientAddress.id), patient_address_to_dict),
+    "phones": (_rows_of(PATIENT_PHONE_COLUMNS, PatientPhone.patient_id, PatientPhone.id), patient_phone_to_dict),
+    "appointments": (_appointment_rows, appointment_to_dict),
+}
+
 
-router = APIRouter()
+def load_patient_records(db: Session, patient_ids: List[str], expand: List[str]) -> Dict[str, dict]:
+    """Patients by ID with the requested relationships.
+
+    Uses one IN query for the patients and one per expansion, however many
+    IDs are asked for, instead of a query per patient.
+    """
+    rows = db.execute(select(*PATIENT_COLUMNS).where(Patient.id.in_(patient_ids)))
+    records = {row.id: patient_to_dict(row) for row in rows}
+    if not records:
+        return records
+    for name in expand:
+        rows_of, to_dict = EXPANSIONS[name]
+        for record in records.values():
+            record[name] = []
+        for row in db.execute(rows_of(list(records))):
+            records[row.patient_id][name].append(to_dict(row))
+    return records
+
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    names = [name.strip() for name in (expand or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in get_args(PatientExpansion)]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown expand {', '.join(unknown)}; expected any of {', '.join(get_args(PatientExpansion))}"
+        )
+    return list(dict.fromkeys(names))
 
 @router.post("/patients", response_model=PatientCreateResponse)
 async def create_patient(
@@ -17,13 +79,35 @@ async def create_patient(
     db: Session = Depends(get_db),
     _: bool = Depends(verify_token)
 ):
+    try:
+        date_of_birth = parse_date(patient_data.patient.date_of_birth)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date_of_birth format"
+        )
+    
+    match_key = patient_match_key(patient_data.patient.first_name, patient_data.patient.last_name, date_of_birth)
+    
+    # Optionally look for the same person first (an index lookup on match_key)
+    if DUPLICATE_PATIENT_POLICY != "allow":
+        existing_id = db.query(Patient.id).filter(Patient.match_key == match_key).limit(1).scalar()
+        if existing_id and DUPLICATE_PATIENT_POLICY == "return":
+            return PatientCreateResponse(patient=existing_id)
+        if existing_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Patient already exists: {existing_id}"
+            )
+    
     # Create patient
-    patient_id = str(uuid.uuid4())
+    patient_id = new_id()
     patient = Patient(
         id=patient_id,
         first_name=patient_data.patient.first_name,
         last_name=patient_data.patient.last_name,
-        date_of_birth=patient_data.patient.date_of_birth
+        date_of_birth=date_of_birth,
+        match_key=match_key
     )
     db.add(patient)
     
@@ -53,59 +137,93 @@ async def create_patient(
         )
         db.add(phone)
     
+    stats.record_patient_created(db, patient)
     db.commit()
     
     return PatientCreateResponse(patient=patient_id)
 
+@router.get("/patients", response_model=PatientListResponse)
+async def list_patients(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_token)
+):
+    """Patients in ID order, a page at a time, read straight from the primary key.
+
+    With FAKE_CARECLOUD_ID_FORMAT=uuid7 ID order is creation order. Pages continue
+    from ``after``, the ``next`` of the previous page (the last ID returned).
+    """
+    query = select(*PATIENT_COLUMNS)
+    if after:
+        query = query.where(Patient.id > after)
+    
+    rows = db.execute(query.order_by(Patient.id).limit(limit + 1)).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    
+    return json_response(PATIENT_PAGE.dump_json({
+        "patients": PATIENTS.to_dicts(rows[:limit]),
+        "next": next_cursor,
+    }))
+
 @router.post("/patients/search", response_model=PatientSearchResponse)
 async def search_patients(
     search_data: PatientSearchRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: bool = Depends(verify_token)
 ):
-    query = db.query(Patient)
+    # Only the response columns are selected; rows are never loaded as ORM objects
+    query = select(*PATIENT_COLUMNS)
     
     # Filter by search criteria
     if search_data.fields.first_name:
-        query = query.filter(Patient.first_name.ilike(f"%{search_data.fields.first_name}%"))
+        query = query.where(Patient.first_name.ilike(f"%{search_data.fields.first_name}%"))
     
     if search_data.fields.last_name:
-        query = query.filter(Patient.last_name.ilike(f"%{search_data.fields.last_name}%"))
+        query = query.where(Patient.last_name.ilike(f"%{search_data.fields.last_name}%"))
     
     if search_data.fields.date_of_birth:
-        query = query.filter(Patient.date_of_birth == search_data.fields.date_of_birth)
+        try:
+            date_of_birth = parse_date(search_data.fields.date_of_birth)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid date_of_birth format"
+            )
+        query = query.where(Patient.date_of_birth == date_of_birth)
     
-    patients = query.all()
+    rows = db.execute(query)
     
-    patient_responses = [
-        PatientResponse(
-            id=patient.id,
-            first_name=patient.first_name,
-            last_name=patient.last_name,
-            date_of_birth=patient.date_of_birth
-        )
-        for patient in patients
-    ]
+    return json_response(PATIENT_LIST.dump_json({"patients": PATIENTS.to_dicts(rows)}))
+
+@router.post("/patients/batch_get", response_model=PatientBatchGetResponse)
+async def batch_get_patients(
+    batch: PatientBatchGetRequest,
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_token)
+):
+    patient_ids = list(dict.fromkeys(batch.ids))
+    records = load_patient_records(db, patient_ids, list(dict.fromkeys(batch.expand)))
     
-    return PatientSearchResponse(patients=patient_responses)
+    return JSONResponse({
+        "patients": [records[patient_id] for patient_id in patient_ids if patient_id in records],
+        "not_found": [patient_id for patient_id in patient_ids if patient_id not in records],
+    })
 
-@router.get("/patients/{patient_id}", response_model=PatientResponse)
+@router.get("/patients/{patient_id}", response_model=PatientRecordResponse)
 async def get_patient(
     patient_id: str,
-    db: Session = Depends(get_db),
+    expand: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     _: bool = Depends(verify_token)
 ):
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    """Get a patient. ``expand`` adds a comma-separated list of addresses, phones and appointments."""
+    records = load_patient_records(db, [patient_id], parse_expand(expand))
     
-    if not patient:
+    if not records:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Patient not found"
         )
     
-    return PatientResponse(
-        id=patient.id,
-        first_name=patient.first_name,
-        last_name=patient.last_name,
-        date_of_birth=patient.date_of_birth
-    )
\ No newline at end of file
+    return JSONResponse(records[patient_id])
@@ -0,0 +1,170 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+from database import get_db, get_read_db
+from models import Appointment, AppointmentSeries, ArchivedAppointment, Patient
+from schemas import (
+    AppointmentSeriesRequest, AppointmentSeriesCreateResponse, AppointmentSeriesUpdate,
+    AppointmentSeriesUpdateResponse, AppointmentSeriesResponse
+)
+from auth import verify_token
+from rate_limit import rate_limit
+from dates import parse_local_datetime, to_naive_utc
+from projections import APPOINTMENT_COLUMNS, ARCHIVED_APPOINTMENT_COLUMNS, appointment_to_dict
+from recurrence import RecurrenceRule
+import series as appointment_series
+
+router = APIRouter(dependencies=[Depends(rate_limit("appointments"))])
+
+
+def get_series_or_404(db: Session, series_id: str) -> AppointmentSeries:
+    series = db.query(AppointmentSeries).filter(AppointmentSeries.id == series_id).first()
+    if not series:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Appointment series not found"
+        )
+    return series
+
+
+@router.post("/appointment_series", response_model=AppointmentSeriesCreateResponse)
+async def create_appointment_series(
+    series_data: AppointmentSeriesRequest,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    appointment_data = series_data.appointment
+    patient = db.query(Patient.id).filter(Patient.id == appointment_data.patient.id).first()
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Patient not found"
+        )
+
+    try:
+        # Kept in the client's offset for expanding the rule; stored as UTC
+        local_start = parse_local_datetime(appointment_data.start_time)
+        local_end = parse_local_datetime(appointment_data.end_time)
+        start_time = to_naive_utc(local_start)
+        end_time = to_naive_utc(local_end)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid datetime format"
+        )
+    if not start_time < end_time <= start_time + appointment_series.MAX_APPOINTMENT_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_time must be after start_time and at most a day later"
+        )
+
+    try:
+        rule = RecurrenceRule.parse(series_data.recurrence)
+        occurrences = list(appointment_series.expand(rule, local_start, local_end))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recurrence: {e}"
+        )
+    if not occurrences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The recurrence has no occurrences"
+        )
+
+    conflicts = appointment_series.find_conflicts(db, occurrences, appointment_data.provider_id, appointment_data.patient.id)
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": f"{len(conflicts)} occurrence(s) conflict with existing appointments", "conflicts": conflicts}
+        )
+
+    series = AppointmentSeries(
+        recurrence=series_data.recurrence,
+        start_time=start_time,
+        end_time=end_time,
+        provider_id=appointment_data.provider_id,
+        location_id=appointment_data.location_id,
+        visit_reason_id=appointment_data.visit_reason_id,
+        resource_id=appointment_data.resource_id,
+        patient_id=appointment_data.patient.id
+    )
+    appointment_ids = appointment_series.create_series(db, series, occurrences)
+    db.commit()
+
+    return AppointmentSeriesCreateResponse(series=series.id, appointments=appointment_ids)
+
+@router.get("/appointment_series/{series_id}", response_model=AppointmentSeriesResponse)
+async def get_appointment_series(
+    series_id: str,
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_token)
+):
+    series = get_series_or_404(db, series_id)
+
+    # Past occurrences may have been archived
+    rows = db.execute(union_all(
+        select(*APPOINTMENT_COLUMNS).where(Appointment.series_id == series_id),
+        select(*ARCHIVED_APPOINTMENT_COLUMNS).where(ArchivedAppointment.series_id == series_id)
+    ))
+    appointments = sorted((appointment_to_dict(row) for row in rows), key=lambda appointment: appointment["start_time"])
+
+    return JSONResponse({
+        "id": series.id,
+        "recurrence": series.recurrence,
+        "start_time": series.start_time.isoformat(),
+        "end_time": series.end_time.isoformat(),
+        "provider_id": series.provider_id,
+        "location_id": series.location_id,
+        "visit_reason_id": series.visit_reason_id,
+        "resource_id": series.resource_id,
+        "patient_id": series.patient_id,
+        "status": series.status,
+        "appointments": appointments,
+    })
+
+@router.put("/appointment_series/{series_id}", response_model=AppointmentSeriesUpdateResponse)
+async def update_appointment_series(
+    series_id: str,
+    changes: AppointmentSeriesUpdate,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    """Change the provider, location, visit reason or resource of every scheduled or confirmed occurrence."""
+    series = get_series_or_404(db, series_id)
+
+    values = changes.model_dump(exclude_none=True)
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update"
+        )
+
+    # Times don't change, so only a new provider can create overlaps
+    if values.get("provider_id", series.provider_id) != series.provider_id:
+        conflicts = appointment_series.provider_conflicts(db, series, values["provider_id"])
+        if conflicts:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": f"{len(conflicts)} occurrence(s) conflict with the provider's appointments", "conflicts": conflicts}
+            )
+
+    updated = appointment_series.update_series(db, series, values)
+    db.commit()
+
+    return AppointmentSeriesUpdateResponse(series=series_id, updated=updated)
+
+@router.delete("/appointment_series/{series_id}")
+async def cancel_appointment_series(
+    series_id: str,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_token)
+):
+    """Cancel every scheduled or confirmed occurrence; occurrences that already happened are kept."""
+    series = get_series_or_404(db, series_id)
+
+    cancelled = appointment_series.cancel_series(db, series)
+    db.commit()
+
+    return {"message": "Appointment series cancelled successfully", "cancelled": cancelled}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from database import get_read_db
+from schemas import StatsResponse
+from auth import verify_token
+from rate_limit import rate_limit
+import stats
+
+router = APIRouter(dependencies=[Depends(rate_limit("reference_data"))])
+
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(
+    db: Session = Depends(get_read_db),
+    _: bool = Depends(verify_token)
+):
+    return StatsResponse(**stats.get_stats(db))
\ No newline at end of file
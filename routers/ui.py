@@ -1,53 +1,326 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.templating import Jinja2Templates
+import base64
+import json
+import time
+import weakref
+from datetime import date, datetime
+from urllib.parse import urlencode
+from fastapi import APIRouter, Depends, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Patient, Appointment
+from markupsafe import Markup, escape
+from sqlalchemy import Date, DateTime, false, or_, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Optional
+from database import get_read_db
+from dates import parse_date, parse_datetime
+from models import Patient, Appointment, Provider, Location, VisitReason
+import stats
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Totals are counted up to this many rows; larger ones show as "10000+"
+MAX_COUNTED_ROWS = 10000
+
+# Reference data only changes when the database is reseeded, so the rendered
+# name fragments are kept for a while instead of being looked up per row.
+REFERENCE_CACHE_TTL = 300
+
+PATIENT_SORTS = {
+    "name": (Patient.last_name, Patient.first_name),
+    "date_of_birth": (Patient.date_of_birth,),
+    "created": (Patient.created_at,),
+}
+
+APPOINTMENT_SORTS = {
+    "start_time": (Appointment.start_time,),
+    "status": (Appointment.status, Appointment.start_time),
+    "created": (Appointment.created_at,),
+}
+
+
+_templates = None
+
+
+def get_templates():
+    """Jinja2 is only imported and the templates loaded when a page is first rendered."""
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory="templates")
+    return _templates
+
+
+def encode_cursor(values) -> str:
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _from_json(column, value):
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    """The sort key values in ``cursor``, converted back to the columns' types."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_from_json(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class Page:
+    """One page of a list view, plus the links needed to navigate it.
+
+    Pages are found by keyset: ``after`` and ``before`` cursors hold the sort
+    key of the row the page continues from, so any page costs an index range
+    scan rather than an OFFSET over all the rows before it.
+    """
+
+    def __init__(self, request: Request, items, per_page: int, total: int, columns, has_prev: bool, has_next: bool):
+        self.request = request
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.total_label = f"{MAX_COUNTED_ROWS}+" if total > MAX_COUNTED_ROWS else str(total)
+        self.has_prev = has_prev
+        self.has_next = has_next
+        keys = [[getattr(item, column.key) for column in columns] for item in (items[0], items[-1])] if items else None
+        self.prev_cursor = encode_cursor(keys[0]) if has_prev and keys else None
+        self.next_cursor = encode_cursor(keys[1]) if has_next and keys else None
+
+    def url(self, **params) -> str:
+        """This page's URL with ``params`` replaced; None removes a parameter."""
+        query = dict(self.request.query_params)
+        query.update(params)
+        return f"{self.request.url.path}?{urlencode({key: value for key, value in query.items() if value is not None})}"
+
+    def first_url(self) -> str:
+        return self.url(after=None, before=None)
+
+    def prev_url(self) -> str:
+        return self.url(after=None, before=self.prev_cursor)
+
+    def next_url(self) -> str:
+        return self.url(after=self.next_cursor, before=None)
+
+    def sort_url(self, sort: str) -> str:
+        current_sort = self.request.query_params.get("sort")
+        current_order = self.request.query_params.get("order", "asc")
+        order = "desc" if sort == current_sort and current_order == "asc" else "asc"
+        return self.url(sort=sort, order=order, after=None, before=None)
+
+
+class ReferenceFragments:
+    """Pre-rendered HTML for provider, location and visit reason names."""
+
+    def __init__(self, providers: dict, locations: dict, visit_reasons: dict):
+        self.providers = providers
+        self.locations = locations
+        self.visit_reasons = visit_reasons
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _render(fragments: dict, ref_id) -> Markup:
+        fragment = fragments.get(ref_id)
+        if fragment is None:
+            return Markup("ID: ") + escape(ref_id)
+        return fragment
+
+    def provider(self, provider_id) -> Markup:
+        return self._render(self.providers, provider_id)
+
+    def location(self, location_id) -> Markup:
+        return self._render(self.locations, location_id)
+
+    def visit_reason(self, visit_reason_id) -> Markup:
+        return self._render(self.visit_reasons, visit_reason_id)
+
+
+# Keyed by engine so each database gets its own fragments
+_reference_cache = weakref.WeakKeyDictionary()
+
+
+def get_reference_fragments(db: Session) -> ReferenceFragments:
+    bind = db.get_bind()
+    fragments = _reference_cache.get(bind)
+    if fragments is None or time.monotonic() - fragments.loaded_at > REFERENCE_CACHE_TTL:
+        fragments = ReferenceFragments(
+            providers={id: escape(name) for id, name in db.query(Provider.id, Provider.name)},
+            locations={id: escape(name) for id, name in db.query(Location.id, Location.name)},
+            visit_reasons={id: escape(name) for id, name in db.query(VisitReason.id, VisitReason.name)},
+        )
+        _reference_cache[bind] = fragments
+    return fragments
+
+
+def paginate(
+    request: Request, query, columns, descending: bool, per_page: int,
+    after: Optional[str] = None, before: Optional[str] = None
+) -> Page:
+    """One page of ``query`` in the order of ``columns`` (unique together), from ``after`` or back from ``before``."""
+    # Counting stops at MAX_COUNTED_ROWS, so the total costs no more than a few pages
+    total = query.limit(MAX_COUNTED_ROWS + 1).count()
+
+    backwards = before is not None and after is None
+    key = tuple_(*columns)
+    if after is not None:
+        values = tuple_(*decode_cursor(after, columns))
+        query = query.filter(key < values if descending else key > values)
+    elif backwards:
+        values = tuple_(*decode_cursor(before, columns))
+        query = query.filter(key > values if descending else key < values)
+    if descending != backwards:
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        query = query.order_by(*columns)
+
+    items = query.limit(per_page + 1).all()
+    more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+        return Page(request, items, per_page, total, columns, has_prev=more, has_next=True)
+    return Page(request, items, per_page, total, columns, has_prev=after is not None, has_next=more)
+
+
+def sort_columns(sorts: dict, sort: str, tiebreaker) -> tuple:
+    return (*(sorts.get(sort) or next(iter(sorts.values()))), tiebreaker)
+
 
 @router.get("/ui", response_class=HTMLResponse)
-async def ui_home(request: Request):
-    return templates.TemplateResponse("index.html", {
+async def ui_home(request: Request, db: Session = Depends(get_read_db)):
+    return get_templates().TemplateResponse("index.html", {
         "request": request,
-        "title": "Fake CareCloud API"
+        "title": "Fake CareCloud API",
+        "stats": stats.get_stats(db),
+        "refs": get_reference_fragments(db)
     })
 
 @router.get("/ui/patients", response_class=HTMLResponse)
-async def ui_patients(request: Request, db: Session = Depends(get_db)):
-    patients = db.query(Patient).all()
-    
-    return templates.TemplateResponse("patients.html", {
+async def ui_patients(
+    request: Request,
+    per_page: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    sort: str = Query("name"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    q: Optional[str] = None,
+    date_of_birth: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    query = db.query(Patient).options(
+        selectinload(Patient.addresses),
+        selectinload(Patient.phones)
+    )
+
+    if q:
+        query = query.filter(or_(
+            Patient.first_name.ilike(f"%{q}%"),
+            Patient.last_name.ilike(f"%{q}%")
+        ))
+
+    if date_of_birth:
+        try:
+            query = query.filter(Patient.date_of_birth == parse_date(date_of_birth))
+        except ValueError:
+            query = query.filter(false())
+
+    columns = sort_columns(PATIENT_SORTS, sort, Patient.id)
+
+    return get_templates().TemplateResponse("patients.html", {
         "request": request,
         "title": "Patients",
-        "patients": patients
+        "page": paginate(request, query, columns, order == "desc", per_page, after, before),
+        "filters": {"q": q or "", "date_of_birth": date_of_birth or ""}
     })
 
 @router.get("/ui/appointments", response_class=HTMLResponse)
-async def ui_appointments(request: Request, db: Session = Depends(get_db)):
-    appointments = db.query(Appointment).all()
-    
-    return templates.TemplateResponse("appointments.html", {
+async def ui_appointments(
+    request: Request,
+    per_page: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    sort: str = Query("start_time"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    status: Optional[str] = None,
+    provider_id: Optional[str] = None,
+    location_id: Optional[str] = None,
+    start_from: Optional[str] = None,
+    start_to: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    query = db.query(Appointment).options(
+        joinedload(Appointment.patient).load_only(Patient.id, Patient.first_name, Patient.last_name)
+    )
+
+    if status:
+        query = query.filter(Appointment.status == status)
+
+    # Empty filter inputs are submitted as empty strings, so IDs arrive as text
+    if provider_id and provider_id.isdigit():
+        query = query.filter(Appointment.provider_id == int(provider_id))
+
+    if location_id and location_id.isdigit():
+        query = query.filter(Appointment.location_id == int(location_id))
+
+    # Time range on the indexed start_time column; bad input matches nothing
+    try:
+        if start_from:
+            query = query.filter(Appointment.start_time >= parse_datetime(start_from))
+        if start_to:
+            query = query.filter(Appointment.start_time < parse_datetime(start_to))
+    except ValueError:
+        query = query.filter(false())
+
+    columns = sort_columns(APPOINTMENT_SORTS, sort, Appointment.id)
+
+    return get_templates().TemplateResponse("appointments.html", {
         "request": request,
-        "title": "Appointments", 
-        "appointments": appointments
+        "title": "Appointments",
+        "page": paginate(request, query, columns, order == "desc", per_page, after, before),
+        "refs": get_reference_fragments(db),
+        "filters": {
+            "status": status or "",
+            "provider_id": provider_id or "",
+            "location_id": location_id or "",
+            "start_from": start_from or "",
+            "start_to": start_to or ""
+        }
     })
 
 @router.get("/ui/patients/{patient_id}", response_class=HTMLResponse)
-async def ui_patient_detail(request: Request, patient_id: str, db: Session = Depends(get_db)):
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    
+async def ui_patient_detail(
+    request: Request,
+    patient_id: str,
+    per_page: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    patient = db.query(Patient).options(
+        selectinload(Patient.addresses),
+        selectinload(Patient.phones)
+    ).filter(Patient.id == patient_id).first()
+
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
-    
-    # Get all appointments for this patient
-    appointments = db.query(Appointment).filter(Appointment.patient_id == patient_id).all()
-    
-    return templates.TemplateResponse("patient_detail.html", {
+
+    # Only one page of this patient's appointments is loaded
+    query = db.query(Appointment).filter(Appointment.patient_id == patient_id)
+    columns = (Appointment.start_time, Appointment.id)
+
+    return get_templates().TemplateResponse("patient_detail.html", {
         "request": request,
         "title": f"Patient: {patient.first_name} {patient.last_name}",
         "patient": patient,
-        "appointments": appointments
-    })
\ No newline at end of file
+        "page": paginate(request, query, columns, True, per_page, after, before),
+        "refs": get_reference_fragments(db)
+    })
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Annotated, Dict, List, Literal, Optional
+from datetime import date, datetime
 
 # Authentication Schemas
 class TokenRequest(BaseModel):
@@ -10,6 +10,7 @@ class TokenRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "Bearer"
+    expires_in: Optional[int] = None
 
 # Provider Schemas
 class ProviderSpecialty(BaseModel):
@@ -116,7 +117,7 @@ class PatientResponse(BaseModel):
     id: str
     first_name: str
     last_name: str
-    date_of_birth: str
+    date_of_birth: date
 
 class PatientCreateResponse(BaseModel):
     patient: str
@@ -127,7 +128,14 @@ class PatientSearchRequest(BaseModel):
 class PatientSearchResponse(BaseModel):
     patients: List[PatientResponse]
 
+class PatientListResponse(BaseModel):
+    patients: List[PatientResponse]
+    # Pass as ``after`` to get the next page; None on the last page
+    next: Optional[str] = None
+
 # Appointment Schemas
+AppointmentStatus = Literal["scheduled", "confirmed", "arrived", "completed", "no_show", "cancelled"]
+
 class AppointmentPatient(BaseModel):
     id: str
 
@@ -153,9 +161,117 @@ class AppointmentResponse(BaseModel):
     resource_id: int
     patient_id: str
     status: str
+    series_id: Optional[str] = None
     
     class Config:
         from_attributes = True
 
 class AppointmentCreateResponse(BaseModel):
-    appointment: str
\ No newline at end of file
+    appointment: str
+
+class AppointmentStatusUpdate(BaseModel):
+    status: AppointmentStatus
+
+class AppointmentListResponse(BaseModel):
+    appointments: List[AppointmentResponse]
+    # Pass as ``after`` to get the next page; None on the last page
+    next: Optional[str] = None
+
+# Appointment Series Schemas
+class AppointmentSeriesRequest(BaseModel):
+    # The first occurrence; the rest follow the rule with the same duration
+    appointment: AppointmentCreate
+    recurrence: str = Field(..., examples=["FREQ=WEEKLY;BYDAY=MO,TH;COUNT=16"])
+
+class AppointmentSeriesCreateResponse(BaseModel):
+    series: str
+    appointments: List[str]
+
+class AppointmentSeriesUpdate(BaseModel):
+    provider_id: Optional[int] = None
+    location_id: Optional[int] = None
+    visit_reason_id: Optional[int] = None
+    resource_id: Optional[int] = None
+
+class AppointmentSeriesUpdateResponse(BaseModel):
+    series: str
+    updated: int
+
+class AppointmentSeriesResponse(BaseModel):
+    id: str
+    recurrence: str
+    start_time: datetime
+    end_time: datetime
+    provider_id: int
+    location_id: int
+    visit_reason_id: int
+    resource_id: int
+    patient_id: str
+    status: str
+    appointments: List[AppointmentResponse]
+
+# Full Patient Record Schemas
+PatientExpansion = Literal["addresses", "phones", "appointments"]
+
+class PatientRecordResponse(PatientResponse):
+    # Present only when requested with expand
+    addresses: Optional[List[PatientAddress]] = None
+    phones: Optional[List[PatientPhone]] = None
+    appointments: Optional[List[AppointmentResponse]] = None
+
+class PatientBatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+    expand: List[PatientExpansion] = []
+
+class PatientBatchGetResponse(BaseModel):
+    patients: List[PatientRecordResponse]
+    not_found: List[str]
+
+# Statistics Schemas
+class StatsResponse(BaseModel):
+    totals: Dict[str, int]
+    appointments_per_day: Dict[str, int]
+    appointments_per_provider: Dict[str, int]
+    appointments_per_status: Dict[str, int]
+    patients_per_day: Dict[str, int]
+
+# Fault Injection Schemas
+class FaultLatency(BaseModel):
+    distribution: Literal["fixed", "normal", "long_tail"] = "fixed"
+    ms: float = Field(0, ge=0)
+    stddev_ms: float = Field(0, ge=0)
+    tail_sigma: float = Field(1.0, gt=0)
+    max_ms: Optional[float] = Field(None, ge=0)
+
+class FaultRule(BaseModel):
+    route: str = "/v2/*"
+    methods: List[str] = []
+    latency: Optional[FaultLatency] = None
+    error_rate: float = Field(0, ge=0, le=1)
+    # Error responses only; a 2xx or 3xx here would fake a success that never ran
+    error_statuses: List[Annotated[int, Field(ge=400, le=599)]] = [500, 502, 503]
+    rate_limit_per_second: Optional[int] = Field(None, ge=0)
+    retry_after: Optional[int] = Field(None, ge=0)
+
+class FaultConfig(BaseModel):
+    enabled: bool = True
+    seed: Optional[int] = None
+    rules: List[FaultRule] = []
+
+class FaultStatus(BaseModel):
+    config: FaultConfig
+    injected: Dict[str, int]
+
+# Profiling Schemas
+class ProfileConfig(BaseModel):
+    enabled: bool = True
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    sample_rate: float = Field(1.0, ge=0, le=1)
+    routes: List[str] = ["/v2/*"]
+    methods: List[str] = []
+    interval_ms: float = Field(1.0, gt=0)
+
+class ProfileStatus(BaseModel):
+    config: ProfileConfig
+    profiled_requests: int
+    samples: int
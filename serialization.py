@@ -0,0 +1,80 @@
+"""Serialization of query rows straight to JSON bytes.
+
+List endpoints return thousands of rows the server produced itself, so
+validating each one against a response model only to serialize it again is
+wasted work. Each serializer pairs a column projection with a TypedDict of
+the same fields and a TypeAdapter built once at import: rows become dicts by
+zipping them with the field names, and pydantic-core writes the JSON (dates
+included) without validating anything.
+"""
+
+from datetime import date, datetime
+from typing import List, Optional
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict  # pydantic needs this one on Python < 3.12
+from projections import APPOINTMENT_COLUMNS, PATIENT_COLUMNS
+
+
+class PatientRow(TypedDict):
+    id: str
+    first_name: str
+    last_name: str
+    date_of_birth: date
+
+
+class AppointmentRow(TypedDict):
+    id: str
+    start_time: datetime
+    end_time: datetime
+    provider_id: int
+    location_id: int
+    visit_reason_id: int
+    resource_id: int
+    patient_id: str
+    status: str
+    series_id: Optional[str]
+
+
+class PatientList(TypedDict):
+    patients: List[PatientRow]
+
+
+class PatientPage(TypedDict):
+    patients: List[PatientRow]
+    next: Optional[str]
+
+
+class AppointmentPage(TypedDict):
+    appointments: List[AppointmentRow]
+    next: Optional[str]
+
+
+class RowSerializer:
+    """Turns rows selected with ``columns`` into ``row_type`` dicts, and lists of rows into JSON."""
+
+    def __init__(self, columns, row_type):
+        self.fields = tuple(column.key for column in columns)
+        if self.fields != tuple(row_type.__annotations__):
+            raise ValueError(f"{row_type.__name__} fields must match the columns {self.fields}")
+        self.list_adapter = TypeAdapter(List[row_type])
+
+    def to_dicts(self, rows) -> List[dict]:
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+    def dump_json(self, rows) -> bytes:
+        return self.list_adapter.dump_json(self.to_dicts(rows))
+
+
+PATIENTS = RowSerializer(PATIENT_COLUMNS, PatientRow)
+APPOINTMENTS = RowSerializer(APPOINTMENT_COLUMNS, AppointmentRow)
+
+PATIENT_LIST = TypeAdapter(PatientList)
+PATIENT_PAGE = TypeAdapter(PatientPage)
+APPOINTMENT_PAGE = TypeAdapter(AppointmentPage)
+
+
+def json_response(content: bytes) -> Response:
+    """A response for JSON that is already serialized (JSONResponse would encode it again)."""
+    return Response(content, media_type="application/json")
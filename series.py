@@ -0,0 +1,176 @@
+"""Recurring appointment series.
+
+Booking a series expands its recurrence rule, checks every occurrence for
+conflicts with one range query, and inserts all occurrences in the caller's
+transaction. Edits and cancellations are single UPDATE statements over the
+series' open occurrences.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from appointment_status import CANCELLED, OPEN_STATUSES, SCHEDULED
+from dates import to_naive_utc
+from ids import new_id
+from models import Appointment, AppointmentSeries
+from recurrence import RecurrenceRule
+import stats
+
+# Longer appointments aren't supported; this bounds the conflict range query from below
+MAX_APPOINTMENT_LENGTH = timedelta(days=1)
+
+
+def expand(rule: RecurrenceRule, start_time: datetime, end_time: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """(start, end) of every occurrence in naive UTC, generated lazily from the rule.
+
+    The rule is expanded in the offset ``start_time`` carries (the client's),
+    so BYDAY means the client's weekdays even when UTC is on another day.
+    """
+    duration = end_time - start_time
+    for occurrence in rule.occurrences(start_time):
+        start = to_naive_utc(occurrence)
+        yield start, start + duration
+
+
+def find_conflicts(
+    db: Session,
+    occurrences: List[Tuple[datetime, datetime]],
+    provider_id: int,
+    patient_id: Optional[str] = None,
+    exclude_series: Optional[str] = None,
+) -> List[dict]:
+    """Occurrences that overlap an active appointment of the same provider or patient.
+
+    One query fetches every candidate in the series' time span (through the
+    start_time index); overlaps are then found by binary search per occurrence.
+    Without ``patient_id`` only the provider's appointments count, and the
+    appointments of ``exclude_series`` never do.
+    """
+    first_start = occurrences[0][0]
+    last_end = max(end for _, end in occurrences)
+    booked_by = Appointment.provider_id == provider_id
+    if patient_id is not None:
+        booked_by = or_(booked_by, Appointment.patient_id == patient_id)
+    query = (
+        select(Appointment.id, Appointment.start_time, Appointment.end_time)
+        .where(
+            Appointment.start_time >= first_start - MAX_APPOINTMENT_LENGTH,
+            Appointment.start_time < last_end,
+            Appointment.end_time > first_start,
+            Appointment.status != CANCELLED,
+            booked_by,
+        )
+        .order_by(Appointment.start_time)
+    )
+    if exclude_series is not None:
+        query = query.where(or_(Appointment.series_id.is_(None), Appointment.series_id != exclude_series))
+    rows = db.execute(query).all()
+    starts = [row.start_time for row in rows]
+
+    conflicts = []
+    for start, end in occurrences:
+        # Only appointments starting in (start - max length, end) can overlap
+        for row in rows[bisect_left(starts, start - MAX_APPOINTMENT_LENGTH):bisect_left(starts, end)]:
+            if row.end_time > start:
+                conflicts.append({"start_time": start.isoformat(), "appointment": row.id})
+    return conflicts
+
+
+def create_series(db: Session, series: AppointmentSeries, occurrences: List[Tuple[datetime, datetime]]) -> List[str]:
+    """Add the series and insert its occurrences (one multi-row INSERT). The caller commits."""
+    db.add(series)
+    db.flush()
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": new_id(),
+            "start_time": start,
+            "end_time": end,
+            "provider_id": series.provider_id,
+            "location_id": series.location_id,
+            "visit_reason_id": series.visit_reason_id,
+            "resource_id": series.resource_id,
+            "patient_id": series.patient_id,
+            "status": SCHEDULED,
+            "series_id": series.id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for start, end in occurrences
+    ]
+    db.execute(insert(Appointment), rows)
+
+    deltas = defaultdict(int)
+    deltas[(stats.TOTALS, "appointments")] += len(rows)
+    deltas[(stats.APPOINTMENTS_PER_STATUS, SCHEDULED)] += len(rows)
+    deltas[(stats.APPOINTMENTS_PER_PROVIDER, series.provider_id)] += len(rows)
+    for start, _ in occurrences:
+        deltas[(stats.APPOINTMENTS_PER_DAY, start.date().isoformat())] += 1
+    stats.increment(db, deltas)
+    return [row["id"] for row in rows]
+
+
+def _open_occurrences(series_id: str):
+    return Appointment.series_id == series_id, Appointment.status.in_(OPEN_STATUSES)
+
+
+def provider_conflicts(db: Session, series: AppointmentSeries, provider_id: int) -> List[dict]:
+    """Open occurrences of the series that would double-book ``provider_id``."""
+    occurrences = db.execute(
+        select(Appointment.start_time, Appointment.end_time)
+        .where(*_open_occurrences(series.id))
+        .order_by(Appointment.start_time)
+    ).all()
+    if not occurrences:
+        return []
+    return find_conflicts(db, [tuple(row) for row in occurrences], provider_id, exclude_series=series.id)
+
+
+def update_series(db: Session, series: AppointmentSeries, changes: dict) -> int:
+    """Apply ``changes`` (provider, location, visit reason, resource) to the series and its open occurrences."""
+    condition = _open_occurrences(series.id)
+    deltas = defaultdict(int)
+    if "provider_id" in changes:
+        counts = db.execute(
+            select(Appointment.provider_id, func.count()).where(*condition).group_by(Appointment.provider_id)
+        ).all()
+        for provider_id, count in counts:
+            deltas[(stats.APPOINTMENTS_PER_PROVIDER, provider_id)] -= count
+            deltas[(stats.APPOINTMENTS_PER_PROVIDER, changes["provider_id"])] += count
+
+    now = datetime.utcnow()
+    result = db.execute(
+        update(Appointment).where(*condition).values(**changes, updated_at=now),
+        execution_options={"synchronize_session": False}
+    )
+    for name, value in changes.items():
+        setattr(series, name, value)
+    series.updated_at = now
+    stats.increment(db, deltas)
+    return result.rowcount
+
+
+def cancel_series(db: Session, series: AppointmentSeries) -> int:
+    """Cancel every open occurrence and mark the series cancelled."""
+    condition = _open_occurrences(series.id)
+    counts = db.execute(
+        select(Appointment.status, func.count()).where(*condition).group_by(Appointment.status)
+    ).all()
+    deltas = defaultdict(int)
+    for status, count in counts:
+        deltas[(stats.APPOINTMENTS_PER_STATUS, status)] -= count
+        deltas[(stats.APPOINTMENTS_PER_STATUS, CANCELLED)] += count
+
+    now = datetime.utcnow()
+    result = db.execute(
+        update(Appointment).where(*condition).values(status=CANCELLED, updated_at=now),
+        execution_options={"synchronize_session": False}
+    )
+    series.status = CANCELLED
+    series.updated_at = now
+    stats.increment(db, deltas)
+    return result.rowcount
@@ -0,0 +1,115 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import Appointment, ArchivedAppointment, Patient, StatCounter
+
+logger = logging.getLogger("fake_carecloud.stats")
+
+# Counter metrics. Each metric maps a key (day, provider id, status...) to a count.
+TOTALS = "totals"
+APPOINTMENTS_PER_DAY = "appointments_per_day"
+APPOINTMENTS_PER_PROVIDER = "appointments_per_provider"
+APPOINTMENTS_PER_STATUS = "appointments_per_status"
+PATIENTS_PER_DAY = "patients_per_day"
+
+METRICS = (
+    TOTALS,
+    APPOINTMENTS_PER_DAY,
+    APPOINTMENTS_PER_PROVIDER,
+    APPOINTMENTS_PER_STATUS,
+    PATIENTS_PER_DAY,
+)
+
+
+def _day(value: datetime) -> str:
+    return value.date().isoformat()
+
+
+def increment(db: Session, deltas: dict):
+    """Apply {(metric, key): delta} to the counters inside the caller's transaction."""
+    for (metric, key), delta in deltas.items():
+        if not delta:
+            continue
+        statement = insert(StatCounter).values(metric=metric, key=str(key), count=delta)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[StatCounter.metric, StatCounter.key],
+            set_={"count": StatCounter.count + delta}
+        ))
+
+
+def _appointment_deltas(deltas: dict, appointment, sign: int):
+    deltas[(APPOINTMENTS_PER_DAY, _day(appointment.start_time))] += sign
+    deltas[(APPOINTMENTS_PER_PROVIDER, appointment.provider_id)] += sign
+
+
+def record_appointment_created(db: Session, appointment: Appointment):
+    deltas = defaultdict(int)
+    deltas[(TOTALS, "appointments")] += 1
+    deltas[(APPOINTMENTS_PER_STATUS, appointment.status)] += 1
+    _appointment_deltas(deltas, appointment, 1)
+    increment(db, deltas)
+
+
+def record_appointment_updated(db: Session, before: Appointment, after: Appointment):
+    """Move day/provider/status counts from the old values of an appointment to the new ones.
+
+    ``before`` only needs ``start_time``, ``provider_id`` and ``status`` attributes.
+    """
+    deltas = defaultdict(int)
+    _appointment_deltas(deltas, before, -1)
+    _appointment_deltas(deltas, after, 1)
+    deltas[(APPOINTMENTS_PER_STATUS, before.status)] -= 1
+    deltas[(APPOINTMENTS_PER_STATUS, after.status)] += 1
+    increment(db, deltas)
+
+
+def record_patient_created(db: Session, patient: Patient):
+    increment(db, {
+        (TOTALS, "patients"): 1,
+        (PATIENTS_PER_DAY, _day(patient.created_at or datetime.utcnow())): 1,
+    })
+
+
+def get_stats(db: Session) -> dict:
+    stats = {metric: {} for metric in METRICS}
+    for metric, key, count in db.query(StatCounter.metric, StatCounter.key, StatCounter.count):
+        if count and metric in stats:
+            stats[metric][key] = count
+    return stats
+
+
+def rebuild(db: Session):
+    """Recompute every counter from the base tables. This is the only full scan.
+
+    Archived appointments are counted too, so archiving doesn't change the statistics.
+    """
+    db.query(StatCounter).delete()
+
+    deltas = defaultdict(int)
+    deltas[(TOTALS, "patients")] = db.query(func.count(Patient.id)).scalar()
+
+    for model in (Appointment, ArchivedAppointment):
+        deltas[(TOTALS, "appointments")] += db.query(func.count(model.id)).scalar()
+        for day, count in db.query(func.date(model.start_time), func.count()).group_by(func.date(model.start_time)):
+            deltas[(APPOINTMENTS_PER_DAY, day)] += count
+        for provider_id, count in db.query(model.provider_id, func.count()).group_by(model.provider_id):
+            deltas[(APPOINTMENTS_PER_PROVIDER, provider_id)] += count
+        for status, count in db.query(model.status, func.count()).group_by(model.status):
+            deltas[(APPOINTMENTS_PER_STATUS, status)] += count
+    for day, count in db.query(func.date(Patient.created_at), func.count()).group_by(func.date(Patient.created_at)):
+        deltas[(PATIENTS_PER_DAY, day)] = count
+
+    increment(db, deltas)
+    db.commit()
+    logger.info("Statistics counters rebuilt")
+
+
+def ensure_counters(db: Session):
+    """Backfill counters for databases created before counters existed."""
+    if db.query(StatCounter).first():
+        return
+    if db.query(Appointment.id).first() or db.query(ArchivedAppointment.id).first() or db.query(Patient.id).first():
+        rebuild(db)
@@ -0,0 +1,100 @@
+import json
+import re
+from typing import Optional
+from database import ISOLATED_PREFIX, current_tenant, is_isolated, isolated_databases, tenant_databases
+
+TENANT_HEADER = b"x-tenant-id"
+
+# Selects an ephemeral isolated database (see database.IsolatedDatabases)
+ISOLATION_HEADER = b"x-isolation-id"
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Access tokens issued to a tenant are "<tenant>.<token>" (token_urlsafe never contains a dot)
+TOKEN_SEPARATOR = "."
+
+
+def tenant_token(tenant: Optional[str], token: str) -> str:
+    return f"{tenant}{TOKEN_SEPARATOR}{token}" if tenant else token
+
+
+def tenant_from_token(token: str) -> Optional[str]:
+    tenant, separator, _ = token.partition(TOKEN_SEPARATOR)
+    return tenant if separator else None
+
+
+def resolve_tenant(headers) -> Optional[str]:
+    """The tenant named by the X-Isolation-ID or X-Tenant-ID header, or else by the bearer token. Raises ValueError.
+
+    Isolated databases are tenants whose names start with ISOLATED_PREFIX, so
+    tokens issued in one select it on their own.
+    """
+    tenant = isolation = token_tenant = None
+    for name, value in headers:
+        if name == ISOLATION_HEADER:
+            isolation = value.decode("latin-1").strip()
+        elif name == TENANT_HEADER:
+            tenant = value.decode("latin-1").strip()
+        elif name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                token_tenant = tenant_from_token(token.strip())
+    if isolation is not None:
+        if not TENANT_ID_PATTERN.match(isolation):
+            raise ValueError(isolation)
+        return ISOLATED_PREFIX + isolation
+    tenant = tenant if tenant is not None else token_tenant
+    if tenant is not None and not TENANT_ID_PATTERN.match(tenant.removeprefix(ISOLATED_PREFIX)):
+        raise ValueError(tenant)
+    return tenant
+
+
+async def send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class TenantMiddleware:
+    """Selects the tenant or isolated database for each request (when either is enabled).
+
+    Unless tenant_databases.create is set, tenants that don't exist yet get
+    404 rather than a new database, as any client can name one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (tenant_databases.enabled or isolated_databases.enabled):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            tenant = resolve_tenant(scope["headers"])
+        except ValueError:
+            await send_error(send, 400, "Invalid tenant ID")
+            return
+
+        isolated = is_isolated(tenant)
+        if tenant is not None and not (isolated_databases if isolated else tenant_databases).enabled:
+            # Names a kind of database this server doesn't have; use the default one
+            tenant, isolated = None, False
+        elif tenant is not None and not isolated and not tenant_databases.create and not tenant_databases.exists(tenant):
+            await send_error(send, 404, "Unknown tenant")
+            return
+
+        token = current_tenant.set(tenant)
+        try:
+            if isolated:
+                # Sessions of an isolated database share its one connection
+                async with isolated_databases.use(tenant):
+                    await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
@@ -0,0 +1,65 @@
+"""Isolated databases (X-Isolation-ID), driven through the ASGI app with TestClient."""
+
+import os
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read when database.py is imported
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/default.db"
+os.environ["FAKE_CARECLOUD_ISOLATION"] = "true"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+PATIENT = {
+    "patient": {"first_name": "Isolated", "last_name": "Patient", "date_of_birth": "1990-01-01"},
+    "addresses": [],
+    "phones": [],
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    import bootstrap
+    from app import app
+
+    # Keep the lifespan's log out of the working tree
+    bootstrap.LOG_FILE = os.path.join(_tmp, "fake_carecloud.log")
+    with TestClient(app) as client:
+        yield client
+
+
+def call_with_timeout(function, seconds=10):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(response=function()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "request did not return"
+    return result["response"]
+
+
+def test_discard_with_own_isolation_header(client):
+    headers = {"X-Isolation-ID": "discard-self"}
+    token = client.post(
+        "/oauth2/access_token", data={"grant_type": "refresh_token", "refresh_token": "dummy"}, headers=headers
+    ).json()["access_token"]
+    headers["Authorization"] = f"Bearer {token}"
+    assert client.post("/v2/patients", json=PATIENT, headers=headers).status_code == 200
+
+    # The DELETE holds the database it discards
+    response = call_with_timeout(lambda: client.delete("/debug/isolation/discard-self", headers=headers))
+    assert response.status_code == 200
+
+    # Later requests with the ID start over from the template rather than hanging
+    response = call_with_timeout(lambda: client.get("/v2/patients", headers=headers))
+    assert response.status_code == 401
+    token = client.post(
+        "/oauth2/access_token", data={"grant_type": "refresh_token", "refresh_token": "dummy"}, headers=headers
+    ).json()["access_token"]
+    response = client.get("/v2/patients", headers={**headers, "Authorization": f"Bearer {token}"})
+    assert response.json()["patients"] == []